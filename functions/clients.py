@@ -0,0 +1,130 @@
+"""
+Warm-instance cache for GCP clients and credentials.
+
+Cloud Functions reuse module state across warm invocations, so clients and
+secrets cached here skip channel setup and token fetches after a cold start.
+Entries expire after a TTL and can be invalidated explicitly.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+from google.cloud import secretmanager, storage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds before a cached client or secret is rebuilt
+CACHE_TTL = float(os.environ.get("CLIENT_CACHE_TTL", "3600"))
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    setup_ms: float  # time the factory took, saved by every later hit
+
+
+_cache: dict[str, _Entry] = {}
+_timings: dict[str, dict] = {}
+_lock = threading.Lock()
+_key_locks: dict[str, threading.Lock] = {}  # held while a key's value is built
+
+
+def cached(key: str, factory: Callable[[], T], ttl: float = CACHE_TTL) -> T:
+    """
+    Return the cached value for key, calling factory on a miss or expiry.
+
+    The factory runs outside the cache-wide lock: callers wanting the same
+    key wait for one build, others aren't held up by it.
+
+    Lookups are tallied per key (count, misses, time taken, and setup time
+    saved by hits) for reporting via pop_timings().
+    """
+    start = time.perf_counter()
+    entry = _fresh_entry(key)
+    hit = entry is not None
+    if entry is None:
+        with _lock:
+            key_lock = _key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Built by another caller while this one waited?
+            entry = _fresh_entry(key)
+            hit = entry is not None
+            if entry is None:
+                value = factory()
+                setup_ms = (time.perf_counter() - start) * 1000
+                entry = _Entry(value, time.monotonic() + ttl, setup_ms)
+                with _lock:
+                    _cache[key] = entry
+
+    with _lock:
+        timing = _timings.setdefault(
+            key, {"lookups": 0, "misses": 0, "ms": 0.0, "saved_ms": 0.0}
+        )
+        timing["lookups"] += 1
+        timing["misses"] += not hit
+        timing["ms"] = round(timing["ms"] + (time.perf_counter() - start) * 1000, 2)
+        if hit:
+            timing["saved_ms"] = round(timing["saved_ms"] + entry.setup_ms, 2)
+    return entry.value
+
+
+def _fresh_entry(key: str) -> _Entry | None:
+    """The unexpired cache entry for key, if any."""
+    with _lock:
+        entry = _cache.get(key)
+    if entry is None or entry.expires_at <= time.monotonic():
+        return None
+    return entry
+
+
+def store(key: str, value: T, ttl: float = CACHE_TTL) -> T:
+    """Cache value under key, replacing any cached entry."""
+    with _lock:
+        _cache[key] = _Entry(value, time.monotonic() + ttl, 0.0)
+    return value
+
+
+def invalidate(key: str | None = None) -> None:
+    """Drop one cached entry, or everything if key is None."""
+    with _lock:
+        if key is None:
+            _cache.clear()
+        else:
+            _cache.pop(key, None)
+
+
+def pop_timings() -> dict[str, dict]:
+    """Return and reset cache lookup timings recorded since the last call."""
+    with _lock:
+        timings = dict(_timings)
+        _timings.clear()
+    return timings
+
+
+def get_storage_client() -> storage.Client:
+    """Get the cached Cloud Storage client."""
+    return cached("storage_client", storage.Client)
+
+
+def get_secret_client() -> secretmanager.SecretManagerServiceClient:
+    """Get the cached Secret Manager client."""
+    return cached("secret_client", secretmanager.SecretManagerServiceClient)
+
+
+def get_secret(secret_id: str) -> str:
+    """Retrieve secret from GCP Secret Manager (cached)."""
+
+    def access() -> str:
+        project_id = os.environ.get("GCP_PROJECT")
+        name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
+        response = get_secret_client().access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+    return cached(f"secret:{secret_id}", access)
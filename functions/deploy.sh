@@ -14,6 +14,9 @@ REGION="${GCP_REGION:-us-east1}"
 BUCKET="${GCS_BUCKET:?Set GCS_BUCKET}"
 FUNCTION_NAME="${CLOUD_FUNCTION_NAME:-cityjobs-fetch}"
 
+# Ship DuckDB extensions with the source so cold starts don't download them
+"$(dirname "$0")/../scripts/bundle-duckdb-extensions.sh"
+
 gcloud functions deploy "$FUNCTION_NAME" \
   --gen2 --runtime python311 --region "$REGION" \
   --project "$PROJECT" \
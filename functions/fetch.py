@@ -1,32 +1,86 @@
 """
 Socrata API client and fetch logic.
 
-Fetches NYC Jobs data and stores raw JSON snapshots in GCS.
+Fetches NYC Jobs data and stores raw NDJSON snapshots in GCS.
 """
 
+import hashlib
 import json
 import logging
 import os
-from datetime import datetime, timezone
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from itertools import chain, islice
+from typing import IO, Any, Callable, TextIO
 
 import requests
-from google.cloud import secretmanager, storage
+from requests.adapters import HTTPAdapter
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+from clients import cached, get_secret
+from models import FetchCursor, SourceFingerprint
+from schema import LARGE_TEXT_COLUMNS, RAW_TYPES, VOLATILE_COLUMNS, transform_columns
 
 logger = logging.getLogger(__name__)
 
 # Socrata API configuration
 SOCRATA_BASE_URL = "https://data.cityofnewyork.us"
 DATASET_ID = "kpav-sd4t"
+RESOURCE_PATH = f"/resource/{DATASET_ID}.json"
+METADATA_PATH = f"/api/views/metadata/v1/{DATASET_ID}"
+CSV_EXPORT_PATH = f"/api/views/{DATASET_ID}/rows.csv"
+# Initial $limit per page (also the rows per :id partition); pages then grow
+# or shrink within [MIN_PAGE_SIZE, MAX_PAGE_SIZE] (see PageSizer)
 PAGE_SIZE = 10000
+MIN_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 50000  # SODA 2.1 $limit cap
+TARGET_PAGE_SECONDS = 10.0
+TARGET_PAGE_BYTES = 16 * 1024 * 1024
+# Raw snapshot format: "ndjson" (SODA API pages, one record per line) or
+# "csv" (bulk export). Older snapshots may be "json" (one JSON array).
+FETCH_FORMAT = os.environ.get("FETCH_FORMAT", "ndjson").lower()
+# Fetch large text columns as a separate request per page, joined on :id
+FETCH_SPLIT = os.environ.get("FETCH_SPLIT", "false").lower() == "true"
+# Max concurrent page requests; 1 fetches pages sequentially
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "4"))
+# Keep-alive connections: each partition in flight fetches its column groups
+# (two when split, see page_queries) on threads of their own
+FETCH_POOL_SIZE = 2 * FETCH_CONCURRENCY
+# Resumable upload chunk size (must be a multiple of 256 KiB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+# Checkpointed pages of unfinished fetches live under this prefix
+PARTIAL_PREFIX = "raw/_partial/"
+MAX_COMPOSE_SOURCES = 32
+# Progress of an unfinished checkpointed fetch. GCS allows about one update
+# per second to an object, so it's rewritten at most every
+# CHECKPOINT_INTERVAL seconds rather than after every page.
+CURSOR_PATH = f"{PARTIAL_PREFIX}cursor.json"
+CHECKPOINT_INTERVAL = 5.0  # seconds
+
+# Snapshot content hashes are sums of per-row SHA-256 digests modulo 2^256
+HASH_MODULUS = 2**256
 
+# HTTP retry configuration
+REQUEST_TIMEOUT = 60  # seconds
+MAX_RETRIES = 5
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 60.0  # seconds
 
-def get_secret(secret_id: str) -> str:
-    """Retrieve secret from GCP Secret Manager."""
-    client = secretmanager.SecretManagerServiceClient()
-    project_id = os.environ.get("GCP_PROJECT")
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
-    return response.payload.data.decode("UTF-8")
+# Client-side rate limit shared by all requests (and threads) of the client,
+# kept under Socrata's per-app-token limit so concurrent fetches don't 429
+RATE_LIMIT_PER_HOUR = int(os.environ.get("SOCRATA_RATE_LIMIT", "1000"))
+RATE_LIMIT_BURST = int(os.environ.get("SOCRATA_RATE_BURST", "100"))
 
 
 def get_socrata_auth() -> tuple[str, str] | None:
@@ -48,25 +102,326 @@ def get_socrata_auth() -> tuple[str, str] | None:
         return None
 
 
-def get_dataset_metadata() -> dict:
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `capacity`.
+
+    Callers that find the bucket empty reserve the next token (the balance
+    goes negative) and sleep until it accrues, so concurrent callers are
+    spaced out evenly instead of all retrying at once.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it's available. Returns seconds waited."""
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Make the next token available no sooner than `seconds` from now.
+
+        Pauses overlap rather than add up, so threads throttled by the same
+        429 hold the bucket back for one Retry-After, not one each.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class PageSizer:
+    """
+    Picks the $limit for the next page from the pages fetched so far.
+
+    After each full page, the size moves toward the one that would take
+    TARGET_PAGE_SECONDS or TARGET_PAGE_BYTES (whichever is smaller) at the
+    observed latency and bytes per row, by at most 2x per page and within
+    [MIN_PAGE_SIZE, MAX_PAGE_SIZE].
+    """
+
+    def __init__(
+        self,
+        size: int = PAGE_SIZE,
+        min_size: int = MIN_PAGE_SIZE,
+        max_size: int = MAX_PAGE_SIZE,
+    ):
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def record(self, limit: int, rows: int, size: int, seconds: float) -> None:
+        """Adjust the page size after a page of `rows` rows and `size` bytes."""
+        if rows < limit or rows == 0:
+            # The last page of a range says little about a full one
+            return
+        ideal = rows * TARGET_PAGE_BYTES / max(size, 1)
+        if seconds > 0:
+            ideal = min(ideal, rows * TARGET_PAGE_SECONDS / seconds)
+        lower = max(self.size / 2, self.min_size)
+        upper = min(self.size * 2, self.max_size)
+        self.size = int(min(max(ideal, lower), upper))
+
+
+class SocrataClient:
+    """
+    Pooled HTTP client for the Socrata API.
+
+    Reuses keep-alive connections through a shared requests.Session, asks for
+    gzip responses, and retries 429/5xx responses and connection errors with
+    jittered exponential backoff (honoring Retry-After when sent).
+
+    Every request first takes a token from a bucket refilled at
+    RATE_LIMIT_PER_HOUR, shared by all threads; a 429 pauses the bucket so
+    every thread backs off, not just the one that was throttled. Page sizes
+    are tuned per $select by a PageSizer. Page sizes and throttle waits are
+    collected for pop_stats.
+    """
+
+    def __init__(
+        self,
+        auth: tuple[str, str] | None = None,
+        base_url: str = SOCRATA_BASE_URL,
+        pool_size: int = FETCH_POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.bytes_received = 0
+        self.rate_limiter = TokenBucket(RATE_LIMIT_PER_HOUR / 3600, RATE_LIMIT_BURST)
+        self._sizers: dict[str | None, PageSizer] = {}
+        self._page_sizes: list[int] = []
+        self._throttle_waits = 0
+        self._throttle_seconds = 0.0
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers["Accept-Encoding"] = "gzip"
+        # One pooled connection per concurrent request; any more are discarded
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(
+        self,
+        path: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        GET base_url + path, retrying transient failures.
+
+        With stream, the body is left unread for the caller to iterate.
+        Otherwise response.elapsed covers the whole download, not just the
+        time to the headers as requests measures it.
+        """
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            self._throttle()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    url,
+                    params=params,
+                    headers=headers,
+                    stream=stream,
+                    timeout=REQUEST_TIMEOUT,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"GET {path} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    response.raise_for_status()
+                    if not stream:
+                        response.elapsed = timedelta(
+                            seconds=time.perf_counter() - start
+                        )
+                        self._count_bytes(response)
+                    return response
+                delay = retry_after_delay(response) or backoff_delay(attempt)
+                logger.warning(
+                    f"GET {path} returned {response.status_code}, "
+                    f"retrying in {delay:.1f}s"
+                )
+                if response.status_code == 429:
+                    # Hold back every thread; this one waits in _throttle
+                    self.rate_limiter.pause(delay)
+                    delay = 0.0
+            time.sleep(delay)
+            attempt += 1
+
+    def _throttle(self) -> None:
+        """Wait for a rate limit token, counting any wait."""
+        wait = self.rate_limiter.acquire()
+        if wait:
+            with self._lock:
+                self._throttle_waits += 1
+                self._throttle_seconds += wait
+
+    def page_limit(self, select: str | None) -> int:
+        """$limit for the next page of a query with this $select."""
+        with self._lock:
+            limit = self._sizers.setdefault(select, PageSizer()).size
+            self._page_sizes.append(limit)
+        return limit
+
+    def record_page(
+        self, select: str | None, limit: int, rows: int, size: int, seconds: float
+    ) -> None:
+        """Feed a fetched page's row count, size and latency to its PageSizer."""
+        with self._lock:
+            self._sizers.setdefault(select, PageSizer()).record(
+                limit, rows, size, seconds
+            )
+
+    def pop_stats(self) -> dict[str, Any]:
+        """Return and reset the page sizes and throttle waits since the last call."""
+        with self._lock:
+            stats = {
+                "page_sizes": self._page_sizes,
+                "throttle_waits": self._throttle_waits,
+                "throttle_seconds": round(self._throttle_seconds, 3),
+            }
+            self._page_sizes = []
+            self._throttle_waits = 0
+            self._throttle_seconds = 0.0
+        return stats
+
+    def _count_bytes(self, response: requests.Response) -> None:
+        """Add the response's on-the-wire (possibly gzipped) size to the total."""
+        size = len(response.content)
+        try:
+            size = response.raw.tell() or size
+        except (AttributeError, OSError):
+            pass
+        self.add_bytes(size)
+
+    def add_bytes(self, size: int) -> None:
+        """Add bytes read from a streamed response to the total."""
+        with self._lock:
+            self.bytes_received += size
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def retry_after_delay(response: requests.Response) -> float | None:
+    """Parse a Retry-After header (seconds or HTTP date), capped at BACKOFF_MAX."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), BACKOFF_MAX)
+
+
+def get_client() -> SocrataClient:
+    """Get the shared Socrata client (reused across warm invocations)."""
+    return cached("socrata_client", lambda: SocrataClient(get_socrata_auth()))
+
+
+def get_dataset_metadata(client: SocrataClient) -> dict:
     """Fetch dataset metadata from Socrata."""
-    url = f"{SOCRATA_BASE_URL}/api/views/metadata/v1/{DATASET_ID}"
-    response = requests.get(url)
-    response.raise_for_status()
+    response = client.get(METADATA_PATH)
     return response.json()
 
 
-def fetch_process_date(auth: tuple[str, str] | None) -> str | None:
-    """Fetch just 1 record to get the process_date (lightweight check)."""
-    url = f"{SOCRATA_BASE_URL}/resource/{DATASET_ID}.json"
-    params = {"$limit": 1}
+def fetch_aggregates(client: SocrataClient) -> dict:
+    """Fetch row count, max posting_updated and process_date in one query."""
+    params = {
+        "$select": (
+            "count(*) as row_count, "
+            "max(posting_updated) as max_posting_updated, "
+            "max(process_date) as process_date"
+        )
+    }
+    response = client.get(RESOURCE_PATH, params=params)
+    return response.json()[0]
 
-    if auth:
-        response = requests.get(url, params=params, auth=auth)
-    else:
-        response = requests.get(url, params=params)
 
-    response.raise_for_status()
+def check_for_changes(
+    client: SocrataClient, previous: SourceFingerprint | None
+) -> tuple[bool, SourceFingerprint | None]:
+    """
+    Cheaply decide whether the dataset may have changed since `previous`.
+
+    1. Conditional GET of the metadata endpoint: a 304 means unchanged.
+    2. Same dataUpdatedAt as before: unchanged.
+    3. Otherwise compare an aggregate fingerprint (row count, latest
+       posting_updated, process_date), since dataUpdatedAt can move without
+       the rows changing.
+
+    Returns (changed, current fingerprint).
+    """
+    headers = {}
+    if previous and previous.etag:
+        headers["If-None-Match"] = previous.etag
+    if previous and previous.last_modified:
+        headers["If-Modified-Since"] = previous.last_modified
+
+    response = client.get(METADATA_PATH, headers=headers)
+    if response.status_code == 304:
+        return False, previous
+
+    fingerprint = SourceFingerprint(
+        etag=response.headers.get("ETag"),
+        last_modified=response.headers.get("Last-Modified"),
+        data_updated_at=response.json().get("dataUpdatedAt"),
+    )
+    if (
+        previous
+        and fingerprint.data_updated_at
+        and fingerprint.data_updated_at == previous.data_updated_at
+    ):
+        return False, replace(
+            previous, etag=fingerprint.etag, last_modified=fingerprint.last_modified
+        )
+
+    aggregates = fetch_aggregates(client)
+    fingerprint.row_count = int(aggregates.get("row_count", 0))
+    fingerprint.max_posting_updated = aggregates.get("max_posting_updated")
+    fingerprint.process_date = aggregates.get("process_date")
+    return not fingerprint.same_data(previous), fingerprint
+
+
+def fetch_process_date(client: SocrataClient) -> str | None:
+    """Fetch just 1 record to get the process_date (lightweight check)."""
+    response = client.get(RESOURCE_PATH, params={"$limit": 1})
     records = response.json()
 
     if records and "process_date" in records[0]:
@@ -74,49 +429,784 @@ def fetch_process_date(auth: tuple[str, str] | None) -> str | None:
     return None
 
 
-def fetch_all_jobs(auth: tuple[str, str] | None) -> list[dict]:
-    """Fetch all job records from Socrata with pagination."""
-    all_records = []
-    offset = 0
+def fetch_row_count(client: SocrataClient, where: str | None = None) -> int:
+    """Fetch the number of records in the dataset (optionally filtered)."""
+    params = {"$select": "count(*) as count"}
+    if where:
+        params["$where"] = where
+    response = client.get(RESOURCE_PATH, params=params)
+    return int(response.json()[0]["count"])
+
+
+def fetch_max_updated_at(client: SocrataClient) -> str | None:
+    """Fetch the latest Socrata :updated_at across all rows."""
+    params = {"$select": "max(:updated_at) as max_updated_at"}
+    response = client.get(RESOURCE_PATH, params=params)
+    records = response.json()
+    return records[0].get("max_updated_at") if records else None
+
+
+def page_queries(query: dict | None = None, split: bool = False) -> list[dict]:
+    """
+    SoQL parameters for each request that makes up one page.
+
+    Unless the query has its own $select, only :id and the columns used by
+    transform.sql are requested. With split, the large text columns are
+    fetched by a second request per page and joined back on :id.
+    """
+    query = query or {}
+    if "$select" in query:
+        return [query]
+
+    columns = transform_columns()
+    groups = [columns]
+    if split:
+        groups = [
+            [c for c in columns if c not in LARGE_TEXT_COLUMNS],
+            [c for c in columns if c in LARGE_TEXT_COLUMNS],
+        ]
+    return [{"$select": ", ".join([":id", *group]), **query} for group in groups]
+
+
+def fetch_page(client: SocrataClient, query: dict, limit: int) -> list[dict]:
+    """Fetch a single page of up to `limit` job records in :id order."""
+    params = {"$limit": limit, "$order": ":id", **query}
+    response = client.get(RESOURCE_PATH, params=params)
+    start = time.perf_counter()
+    records = response.json()
+    # Download (without rate limit waits or retries) plus parsing
+    seconds = response.elapsed.total_seconds() + time.perf_counter() - start
+    client.record_page(
+        query.get("$select"), limit, len(records), len(response.content), seconds
+    )
+    return records
+
+
+def keyset_where(
+    where: str | None, after_id: str | None, until_id: str | None
+) -> str | None:
+    """Combine a base $where with an exclusive/inclusive :id range."""
+    conditions = [
+        c
+        for c in (
+            where,
+            after_id and f":id > '{after_id}'",
+            until_id and f":id <= '{until_id}'",
+        )
+        if c
+    ]
+    return " AND ".join(f"({c})" for c in conditions) or None
 
+
+def iter_keyset_pages(
+    client: SocrataClient,
+    query: dict,
+    after_id: str | None = None,
+    until_id: str | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Yield pages in (after_id, until_id] by keyset pagination.
+
+    Each page asks for rows with :id past the last one seen, so pages don't
+    get slower with depth and don't shift if rows are added or removed. The
+    page size can change from page to page (see PageSizer).
+    """
     while True:
-        url = f"{SOCRATA_BASE_URL}/resource/{DATASET_ID}.json"
-        params = {"$limit": PAGE_SIZE, "$offset": offset}
+        where = keyset_where(query.get("$where"), after_id, until_id)
+        limit = client.page_limit(query.get("$select"))
+        batch = fetch_page(client, {**query, "$where": where}, limit)
 
-        if auth:
-            response = requests.get(url, params=params, auth=auth)
-        else:
-            response = requests.get(url, params=params)
+        if batch:
+            yield batch
+        if len(batch) < limit:
+            return
 
-        response.raise_for_status()
-        batch = response.json()
+        after_id = batch[-1][":id"]
+
+
+def join_streams(streams: Iterable[Iterable[list[dict]]]) -> Iterator[list[dict]]:
+    """
+    Join column-group page streams over the same :id range row by row on :id.
+
+    Output pages follow the first stream's pages; the others may be paged
+    differently, since each column group gets its own page size.
+    """
+    lead, *others = [iter(stream) for stream in streams]
+    if not others:
+        yield from lead
+        return
+
+    other_rows = [chain.from_iterable(stream) for stream in others]
+    for page in lead:
+        joined = []
+        for row in page:
+            record = dict(row)
+            for rows in other_rows:
+                other = next(rows, None)
+                if other is None or other[":id"] != row[":id"]:
+                    raise RuntimeError(f"Split fetch rows out of step at {row[':id']}")
+                record.update(other)
+            joined.append(record)
+        yield joined
+
+    if any(next(rows, None) is not None for rows in other_rows):
+        raise RuntimeError("Split fetch returned streams of different lengths")
 
-        all_records.extend(batch)
-        logger.info(f"Fetched {len(batch)} records (total: {len(all_records)})")
 
-        if len(batch) < PAGE_SIZE:
-            break
+def fetch_ids(client: SocrataClient, where: str | None = None) -> list[str]:
+    """Fetch the current :id list (optionally filtered) in :id order."""
+    query = {"$select": ":id"}
+    if where:
+        query["$where"] = where
+    return [row[":id"] for batch in iter_keyset_pages(client, query) for row in batch]
 
-        offset += PAGE_SIZE
 
+def id_partitions(ids: list[str]) -> list[tuple[str | None, str | None]]:
+    """
+    Split sorted ids into (after_id, until_id] ranges of PAGE_SIZE rows.
+
+    The first range is open below and the last open above, so rows added
+    mid-fetch still land in some partition.
+    """
+    bounds = ids[PAGE_SIZE - 1 : -1 : PAGE_SIZE]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+
+def iter_job_pages(
+    client: SocrataClient,
+    concurrency: int = FETCH_CONCURRENCY,
+    query: dict | None = None,
+    split: bool = FETCH_SPLIT,
+) -> Iterator[list[dict]]:
+    """
+    Yield pages of job records from Socrata in :id order.
+
+    `query` adds SoQL parameters (e.g. $select, $where) to every page request.
+    `split` fetches narrow and large text columns as separate concurrent
+    requests (see page_queries).
+
+    Pages use keyset pagination on :id. With concurrency > 1, the :id range is
+    partitioned on boundaries from the current id list and partitions are
+    fetched through a bounded thread pool. At most `concurrency` partitions
+    are in flight or buffered at once, so memory stays bounded regardless of
+    dataset size. Split column groups are always fetched on threads of their
+    own, even when the dataset fits in one partition.
+
+    Raises FetchConsistencyError if the number of rows fetched doesn't match
+    the count(*) taken at the start.
+    """
+    query = query or {}
+    queries = page_queries(query, split)
+    expected = fetch_row_count(client, query.get("$where"))
+
+    if len(queries) > 1 or (concurrency > 1 and expected > PAGE_SIZE):
+        partitions = [(None, None)]
+        if expected > PAGE_SIZE:
+            partitions = id_partitions(fetch_ids(client, query.get("$where")))
+        logger.info(
+            f"Fetching {expected} records in {len(partitions)} partitions "
+            f"(concurrency: {concurrency}, requests per page: {len(queries)})"
+        )
+        pages = iter_partitioned_pages(client, queries, partitions, concurrency)
+    else:
+        logger.info(f"Fetching {expected} records")
+        pages = iter_keyset_pages(client, queries[0])
+
+    total = 0
+    for batch in pages:
+        total += len(batch)
+        logger.info(f"Fetched {len(batch)} records (total: {total})")
+        yield batch
+
+    if total != expected:
+        raise FetchConsistencyError(
+            f"Fetched {total} records but count(*) was {expected}; "
+            "dataset changed during fetch"
+        )
+
+
+def iter_partitioned_pages(
+    client: SocrataClient,
+    queries: list[dict],
+    partitions: list[tuple[str | None, str | None]],
+    concurrency: int,
+) -> Iterator[list[dict]]:
+    """
+    Fetch :id partitions concurrently, yielding their pages in order.
+
+    Each column group of a partition is fetched as its own concurrent stream.
+    """
+
+    def fetch_stream(query: dict, bounds: tuple) -> list[list[dict]]:
+        return list(iter_keyset_pages(client, query, *bounds))
+
+    with ThreadPoolExecutor(max_workers=concurrency * len(queries)) as executor:
+
+        def submit(bounds: tuple) -> list[Future[list[list[dict]]]]:
+            return [executor.submit(fetch_stream, q, bounds) for q in queries]
+
+        pending: deque[list[Future[list[list[dict]]]]] = deque()
+        remaining = iter(partitions)
+
+        for bounds in islice(remaining, concurrency):
+            pending.append(submit(bounds))
+
+        try:
+            while pending:
+                streams = [f.result() for f in pending.popleft()]
+                yield from join_streams(streams)
+
+                bounds = next(remaining, None)
+                if bounds is not None:
+                    pending.append(submit(bounds))
+        finally:
+            for futures in pending:
+                for future in futures:
+                    future.cancel()
+
+
+def fetch_all_jobs(
+    client: SocrataClient, concurrency: int = FETCH_CONCURRENCY, **kwargs: Any
+) -> list[dict]:
+    """Fetch all job records from Socrata with pagination."""
+    all_records = []
+    for batch in iter_job_pages(client, concurrency, **kwargs):
+        all_records.extend(batch)
     return all_records
 
 
+def write_ndjson(f: TextIO, pages: Iterable[list[dict]]) -> int:
+    """
+    Stream pages of records to f as newline-delimited JSON.
+
+    Only one page is encoded at a time. Returns the number of records.
+    """
+    count = 0
+    for batch in pages:
+        f.write(ndjson_lines(batch))
+        count += len(batch)
+    return count
+
+
+def ndjson_lines(records: list[dict]) -> str:
+    """Records as NDJSON (json.dumps escapes newlines inside values)."""
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def fetch_dataset_fields(client: SocrataClient) -> list[str]:
+    """Field names of the dataset (X-SODA2-Fields header of a 1-row query)."""
+    response = client.get(RESOURCE_PATH, params={"$limit": 1})
+    return json.loads(response.headers.get("X-SODA2-Fields", "[]"))
+
+
+def check_schema(client: SocrataClient) -> None:
+    """
+    Log drift between the dataset's fields and the declared RAW_TYPES.
+
+    Unexpected fields are ignored by the fetch but may be worth adding;
+    missing ones make the projected fetch fail if transform.sql uses them.
+    """
+    fields = set(fetch_dataset_fields(client))
+    if not fields:
+        logger.warning("Could not read dataset fields to check for schema drift")
+        return
+
+    # System fields (:id, :updated_at, ...) aren't dataset columns
+    fields = {f for f in fields if not f.startswith(":")}
+    declared = {c for c in RAW_TYPES if not c.startswith(":")}
+    unexpected = sorted(fields - declared)
+    missing = sorted(declared - fields)
+    if unexpected:
+        logger.warning(f"Schema drift: unexpected columns {unexpected}")
+    if missing:
+        used = [c for c in missing if c in transform_columns()]
+        logger.log(
+            logging.ERROR if used else logging.WARNING,
+            f"Schema drift: missing columns {missing} (used by transform: {used})",
+        )
+
+
 def get_current_process_date() -> str | None:
     """Get the current process_date from Socrata (lightweight 1-record fetch)."""
-    auth = get_socrata_auth()
-    return fetch_process_date(auth)
+    return fetch_process_date(get_client())
+
+
+def record_digest(record: dict) -> int:
+    """SHA-256 of a record's canonical JSON, ignoring VOLATILE_COLUMNS."""
+    canonical = {k: v for k, v in record.items() if k not in VOLATILE_COLUMNS}
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()
+    return int.from_bytes(hashlib.sha256(data).digest(), "big")
+
+
+def content_hash(records: Iterable[dict], start: str | None = None) -> str:
+    """
+    Order-independent hash of records (sum of their digests mod 2^256).
+
+    `start` continues a hash over earlier pages, so a resumed fetch hashes
+    the same as an uninterrupted one.
+    """
+    total = int(start, 16) if start else 0
+    for record in records:
+        total = (total + record_digest(record)) % HASH_MODULUS
+    return f"{total:064x}"
+
+
+class FetchConsistencyError(Exception):
+    """The dataset changed while it was being fetched."""
+
+
+class DeltaFetchError(Exception):
+    """A delta fetch could not be reconciled with the previous snapshot."""
+
+
+@dataclass
+class FetchResult:
+    """Summary of a fetch_jobs run."""
+
+    record_count: int
+    watermark: str | None  # max :updated_at at the start of the fetch
+    delta: bool  # True if merged from the previous snapshot
+    columns: list[str] | None  # raw columns requested (besides :id), None for CSV
+    bytes_received: int = 0
+    complete: bool = True  # False if a checkpointed fetch stopped early
+    page_sizes: list[int] = field(default_factory=list)  # $limit of each page
+    throttle_waits: int = 0  # requests delayed by the rate limiter
+    throttle_seconds: float = 0.0  # total time spent waiting for it
+    content_hash: str | None = None  # see content_hash(); None for CSV
+    unchanged: bool = False  # rows matched previous_hash, nothing was stored
+
+
+def iter_delta_pages(
+    client: SocrataClient, previous_blob: storage.Blob, watermark: str
+) -> Iterator[list[dict]]:
+    """
+    Yield the full snapshot page by page, from the previous one plus changes.
+
+    Fetches rows with :updated_at after the watermark, then walks the current
+    :id list (which drops removed rows and sets the order) alongside the
+    previous snapshot, streamed line by line. Both are in :id order, so only
+    the changed rows and one page are held at once. The pages match a full
+    fetch record for record.
+
+    Raises DeltaFetchError, possibly after some pages have been yielded, if a
+    current row is in neither the previous snapshot nor the changes.
+    """
+    if not previous_blob.exists():
+        raise DeltaFetchError(f"Previous snapshot {previous_blob.name} not found")
+
+    changed = {}
+    for batch in iter_job_pages(
+        client, query={"$where": f":updated_at > '{watermark}'"}
+    ):
+        for record in batch:
+            changed[record[":id"]] = record
+
+    total = removed = 0
+    with previous_blob.open("r") as f:
+        previous = map(json.loads, f)
+        prev = next(previous, None)
+        try:
+            for batch in iter_job_pages(client, query={"$select": ":id"}):
+                page = []
+                for row in batch:
+                    # Previous rows sorting before the current one were removed
+                    while prev is not None and prev[":id"] < row[":id"]:
+                        removed += 1
+                        prev = next(previous, None)
+                    record = changed.get(row[":id"])
+                    if prev is not None and prev[":id"] == row[":id"]:
+                        record = record or prev
+                        prev = next(previous, None)
+                    if record is None:
+                        raise DeltaFetchError(f"Row {row[':id']} missing from delta")
+                    page.append(record)
+                total += len(page)
+                yield page
+            removed += sum(1 for _ in previous) + (prev is not None)
+        except KeyError:
+            raise DeltaFetchError(f"{previous_blob.name} has no :id column")
+
+    logger.info(
+        f"Delta since {watermark}: {len(changed)} changed, {removed} removed, "
+        f"{total} total"
+    )
+
+
+def fetch_jobs(
+    raw_blob: storage.Blob,
+    previous_blob: storage.Blob | None = None,
+    watermark: str | None = None,
+    cursor: FetchCursor | None = None,
+    on_checkpoint: Callable[[FetchCursor | None], None] | None = None,
+    deadline: float | None = None,
+    previous_hash: str | None = None,
+    on_page: Callable[[list[dict]], None] | None = None,
+) -> FetchResult:
+    """
+    Fetch jobs from Socrata and store them in GCS.
+
+    Only :id and the columns used by transform.sql are fetched.
+
+    If previous_blob and watermark are given, only rows changed since the
+    watermark are fetched and merged into the previous snapshot, falling back
+    to a full fetch if the delta can't be reconciled. The previous snapshot
+    must have been fetched with the same columns.
+
+    Full fetches are checkpointed page by page (see fetch_jobs_checkpointed).
+    Pass the cursor from an interrupted run to resume it (see load_cursor).
+    on_checkpoint is called with the cursor as pages are committed, and with
+    None once the fetch is finished or discarded. The fetch stops early (with
+    result.complete False) once time.monotonic() passes deadline.
+
+    A content hash of the rows is computed as they are fetched. If it equals
+    previous_hash, raw_blob isn't written and result.unchanged is True.
+
+    on_page is called with the snapshot's rows page by page, in order, as
+    they are fetched in this call (a resumed fetch only passes the rest; a
+    delta that falls back to a full fetch partway has passed extra pages).
+    """
+    client = get_client()
+    bytes_before = client.bytes_received
+    client.pop_stats()
+    on_checkpoint = on_checkpoint or (lambda c: None)
+
+    if cursor is not None and cursor.raw_path != raw_blob.name:
+        logger.info(f"Discarding stale partial fetch of {cursor.raw_path}")
+        discard_partial(raw_blob.bucket, cursor.raw_path)
+        on_checkpoint(None)
+        cursor = None
+
+    if cursor is None:
+        check_schema(client)
+        # Taken before fetching so rows updated mid-fetch are picked up next time
+        new_watermark = fetch_max_updated_at(client)
+
+        if previous_blob is not None and watermark is not None:
+            logger.info(f"Fetching job records changed since {watermark}...")
+            # Streamed to a staging blob, since whether raw_blob is written
+            # depends on the hash of every row
+            prefix = partial_prefix(raw_blob.name)
+            staged = raw_blob.bucket.blob(f"{prefix}_delta.ndjson")
+            count, digest = 0, content_hash([])
+            try:
+                with open_raw_writer(staged) as f:
+                    for batch in iter_delta_pages(client, previous_blob, watermark):
+                        if on_page is not None:
+                            on_page(batch)
+                        digest = content_hash(batch, digest)
+                        count += write_ndjson(f, [batch])
+            except DeltaFetchError as e:
+                logger.warning(f"Delta fetch failed, falling back to full fetch: {e}")
+            else:
+                unchanged = digest == previous_hash
+                if unchanged:
+                    logger.info("Rows unchanged since the previous snapshot")
+                else:
+                    raw_blob.content_type = NDJSON_CONTENT_TYPE
+                    raw_blob.compose([staged])
+                    logger.info(f"Stored raw snapshot: {raw_blob.name}")
+                discard_partial(raw_blob.bucket, raw_blob.name)
+                return FetchResult(
+                    count,
+                    new_watermark,
+                    delta=True,
+                    columns=transform_columns(),
+                    bytes_received=client.bytes_received - bytes_before,
+                    content_hash=digest,
+                    unchanged=unchanged,
+                    **client.pop_stats(),
+                )
+
+        cursor = FetchCursor(raw_path=raw_blob.name, watermark=new_watermark)
+        logger.info("Fetching all job records...")
+    else:
+        logger.info(
+            f"Resuming fetch after {cursor.record_count} records "
+            f"({cursor.pages} pages)"
+        )
+
+    complete = fetch_jobs_checkpointed(
+        client, raw_blob, cursor, on_checkpoint, deadline, on_page
+    )
+    digest = content_hash([], cursor.content_hash)
+    unchanged = complete and digest == previous_hash
+    if complete:
+        prefix = partial_prefix(raw_blob.name)
+        if unchanged:
+            logger.info("Rows unchanged since the previous snapshot")
+        else:
+            assemble_raw(raw_blob, prefix, cursor.pages)
+            logger.info(f"Stored raw snapshot: {raw_blob.name}")
+        discard_partial(raw_blob.bucket, raw_blob.name)
+        on_checkpoint(None)
+
+    return FetchResult(
+        cursor.record_count,
+        cursor.watermark,
+        delta=False,
+        columns=transform_columns(),
+        bytes_received=client.bytes_received - bytes_before,
+        complete=complete,
+        content_hash=digest,
+        unchanged=unchanged,
+        **client.pop_stats(),
+    )
+
+
+def partial_prefix(raw_path: str) -> str:
+    """GCS prefix holding the checkpointed pages of a raw snapshot."""
+    name = raw_path.removeprefix("raw/").rsplit(".", 1)[0]
+    return f"{PARTIAL_PREFIX}{name}/"
+
+
+def discard_partial(bucket: storage.Bucket, raw_path: str) -> None:
+    """Delete the checkpointed pages of a raw snapshot."""
+    for blob in bucket.list_blobs(prefix=partial_prefix(raw_path)):
+        blob.delete()
+
+
+def load_cursor(bucket: storage.Bucket) -> FetchCursor | None:
+    """The cursor of the unfinished checkpointed fetch, if any."""
+    blob = bucket.blob(CURSOR_PATH)
+    if not blob.exists():
+        return None
+    return FetchCursor.from_json(blob.download_as_text())
+
+
+def save_cursor(bucket: storage.Bucket, cursor: FetchCursor | None) -> None:
+    """Store the cursor of an unfinished fetch, or delete it if None."""
+    blob = bucket.blob(CURSOR_PATH)
+    if cursor is not None:
+        blob.upload_from_string(cursor.to_json(), content_type="application/json")
+    else:
+        with suppress(NotFound):
+            blob.delete()
+
+
+def fetch_jobs_checkpointed(
+    client: SocrataClient,
+    raw_blob: storage.Blob,
+    cursor: FetchCursor,
+    on_checkpoint: Callable[[FetchCursor | None], None],
+    deadline: float | None = None,
+    on_page: Callable[[list[dict]], None] | None = None,
+) -> bool:
+    """
+    Fetch pages into raw/_partial/<process_date>/, one blob per page.
+
+    Fetching resumes after cursor.last_id. Each page is stored as a JSON
+    fragment before the cursor (row count, content hash, last :id) is
+    advanced. The cursor is handed to on_checkpoint at most every
+    CHECKPOINT_INTERVAL seconds and when the fetch stops, so a crash loses at
+    most that much work; pages stored after the last checkpoint are fetched
+    and stored again on resume. Uploads run on a background thread while the
+    next page is fetched. assemble_raw composes the stored pages into
+    raw_blob.
+
+    on_page, if given, is called with each page as soon as it is fetched.
+
+    Returns False if the deadline passed before the fetch finished. If the
+    dataset changed during the fetch (including between the runs of a
+    resumed one, checked against a fresh count(*) at the end), the stored
+    pages are discarded, on_checkpoint is called with None and
+    FetchConsistencyError is raised, so the next run starts over.
+    """
+    bucket = raw_blob.bucket
+    prefix = partial_prefix(raw_blob.name)
+    resumed = cursor.last_id is not None
+    query = {"$where": f":id > '{cursor.last_id}'"} if resumed else None
+
+    def upload(page_number: int, batch: list[dict]) -> list[dict]:
+        bucket.blob(f"{prefix}{page_number:05d}.ndjson").upload_from_string(
+            ndjson_lines(batch), content_type=NDJSON_CONTENT_TYPE
+        )
+        return batch
+
+    last_checkpoint = time.monotonic()
+
+    def commit(future: Future[list[dict]], final: bool = False) -> None:
+        nonlocal last_checkpoint
+        batch = future.result()
+        cursor.pages += 1
+        cursor.last_id = batch[-1][":id"]
+        cursor.record_count += len(batch)
+        cursor.content_hash = content_hash(batch, cursor.content_hash)
+        if final or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+            on_checkpoint(cursor)
+            last_checkpoint = time.monotonic()
+
+    pages = iter_job_pages(client, query=query)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as uploader:
+            pending: Future[list[dict]] | None = None
+            try:
+                for batch in pages:
+                    if on_page is not None:
+                        on_page(batch)
+                    if pending is not None:
+                        commit(pending)
+                    pending = uploader.submit(upload, cursor.pages, batch)
+
+                    if deadline is not None and time.monotonic() > deadline:
+                        commit(pending, final=True)
+                        logger.info(
+                            f"Fetch time budget used, stopping after "
+                            f"{cursor.pages} pages ({cursor.record_count} records)"
+                        )
+                        return False
 
+                if pending is not None:
+                    commit(pending, final=True)
+            finally:
+                pages.close()
 
-def fetch_jobs(raw_blob: storage.Blob) -> str | None:
-    """Fetch jobs from Socrata and store in GCS."""
-    logger.info("Fetching all job records...")
-    auth = get_socrata_auth()
-    jobs = fetch_all_jobs(auth)
-    logger.info(f"Fetched {len(jobs)} total records")
+        # This run only counted rows past where it resumed
+        if resumed:
+            expected = fetch_row_count(client)
+            if cursor.record_count != expected:
+                raise FetchConsistencyError(
+                    f"Fetched {cursor.record_count} records over several runs "
+                    f"but count(*) is now {expected}; dataset changed during fetch"
+                )
+    except FetchConsistencyError:
+        # Pages from before and after the change must not be assembled together
+        logger.warning(f"Discarding {cursor.pages} fetched pages")
+        discard_partial(bucket, raw_blob.name)
+        on_checkpoint(None)
+        raise
 
-    raw_blob.upload_from_string(
-        json.dumps(jobs),
-        content_type="application/json",
+    logger.info(f"Fetched {cursor.record_count} total records")
+    return True
+
+
+def assemble_raw(raw_blob: storage.Blob, prefix: str, pages: int) -> None:
+    """
+    Compose the page fragments under prefix into raw_blob atomically.
+
+    The output is identical to write_ndjson over the same records.
+    """
+    bucket = raw_blob.bucket
+    raw_blob.content_type = NDJSON_CONTENT_TYPE
+    if pages == 0:
+        raw_blob.upload_from_string("", content_type=NDJSON_CONTENT_TYPE)
+        return
+
+    sources = [bucket.blob(f"{prefix}{i:05d}.ndjson") for i in range(pages)]
+
+    # GCS composes at most 32 sources per call; fold the rest into a staging
+    # blob so raw_blob only ever appears complete
+    staged = bucket.blob(f"{prefix}_staged.ndjson")
+    while len(sources) > MAX_COMPOSE_SOURCES:
+        staged.compose(sources[:MAX_COMPOSE_SOURCES])
+        sources = [staged] + sources[MAX_COMPOSE_SOURCES:]
+
+    raw_blob.compose(sources)
+
+
+def fetch_jobs_csv(raw_blob: storage.Blob) -> FetchResult:
+    """
+    Stream Socrata's bulk CSV export straight to GCS.
+
+    The export is one streamed response copied chunk by chunk into the
+    resumable upload; process_jobs reads it with read_csv. Delta fetches
+    aren't possible from a CSV snapshot (no :id column).
+    """
+    client = get_client()
+    client.pop_stats()
+    count = fetch_row_count(client)
+
+    logger.info(f"Streaming CSV export ({count} records)...")
+    response = client.get(
+        CSV_EXPORT_PATH, params={"accessType": "DOWNLOAD"}, stream=True
+    )
+    size = 0
+    with response, open_raw_writer(raw_blob, "wb", "text/csv") as f:
+        for chunk in response.iter_content(chunk_size=UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            size += len(chunk)
+    client.add_bytes(size)
+
+    logger.info(f"Stored raw snapshot: {raw_blob.name} ({size} bytes)")
+    return FetchResult(
+        count,
+        None,
+        delta=False,
+        columns=None,
+        bytes_received=size,
+        **client.pop_stats(),
     )
-    logger.info(f"Stored raw snapshot: {raw_blob.name}")
+
+
+@contextmanager
+def open_raw_writer(
+    raw_blob: storage.Blob, mode: str = "w", content_type: str = NDJSON_CONTENT_TYPE
+) -> Iterator[IO]:
+    """
+    Open a chunked resumable upload to the raw blob.
+
+    If the fetch fails partway, the partial upload is deleted so a truncated
+    snapshot is never mistaken for a complete one.
+    """
+    f = raw_blob.open(mode, content_type=content_type, chunk_size=UPLOAD_CHUNK_SIZE)
+    try:
+        yield f
+    except BaseException:
+        with suppress(Exception):
+            f.close()
+        with suppress(NotFound):
+            raw_blob.delete()
+        raise
+    f.close()
+
+
+# Local benchmark: transfer size, fetch time and DuckDB parse time per mode
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    import duckdb
+
+    from process import raw_table_sql
+
+    logging.basicConfig(level=logging.WARNING)
+    out_dir = Path(__file__).parent.parent / "local" / "bench"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    client = SocrataClient(get_socrata_auth())
+    modes = {
+        "full": dict(query={"$select": ":id, *"}),
+        "projected": dict(),
+        "split": dict(split=True),
+        "csv": None,
+    }
+    for name in sys.argv[1:] or modes:
+        bytes_before = client.bytes_received
+        start = time.perf_counter()
+        if modes[name] is None:
+            path = out_dir / f"{name}.csv"
+            response = client.get(
+                CSV_EXPORT_PATH, params={"accessType": "DOWNLOAD"}, stream=True
+            )
+            with response, open(path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=UPLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                client.add_bytes(response.raw.tell())
+        else:
+            path = out_dir / f"{name}.ndjson"
+            with open(path, "w") as f:
+                write_ndjson(f, iter_job_pages(client, **modes[name]))
+        fetch_s = time.perf_counter() - start
+        mb = (client.bytes_received - bytes_before) / 1e6
+
+        start = time.perf_counter()
+        conn = duckdb.connect()
+        conn.execute(raw_table_sql(str(path)))
+        rows = conn.execute("select count(*) from raw").fetchone()[0]
+        parse_s = time.perf_counter() - start
+        stats = client.pop_stats()
+        print(
+            f"{name:>10}: {rows} records, {mb:.1f} MB transferred, "
+            f"{path.stat().st_size / 1e6:.1f} MB on disk, "
+            f"fetch {fetch_s:.1f}s, parse {parse_s:.2f}s, "
+            f"page sizes {stats['page_sizes']}, "
+            f"throttled {stats['throttle_seconds']:.1f}s"
+        )
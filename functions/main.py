@@ -5,21 +5,49 @@ Triggered by Cloud Scheduler (daily) or HTTP request (manual).
 
 Actions:
     latest (default): Fetch new data if available, then process
-    reprocess_all: Delete all processed files and reprocess all raw snapshots
+    reprocess_all: Reprocess raw snapshots whose processed file is out of date
+        (all of them with force=true)
 """
 
-from datetime import datetime, timezone
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
 import json
 import logging
 import os
+import time
 from typing import Any
 
 import functions_framework
 from flask import Request
 
-from fetch import fetch_jobs, get_current_process_date
-from process import process_jobs, update_jobs_history, rebuild_jobs_history
-from models import PipelineState
+from clients import cached, get_storage_client, invalidate, pop_timings, store
+from fetch import (
+    FETCH_FORMAT,
+    PARTIAL_PREFIX,
+    check_for_changes,
+    fetch_jobs,
+    fetch_jobs_csv,
+    get_client,
+    load_cursor,
+    save_cursor,
+)
+from process import (
+    ARTIFACT_PREFIXES,
+    ArrowPages,
+    build_fingerprint,
+    database_path,
+    detail_path,
+    facets_path,
+    fts_index_path,
+    list_path,
+    process_jobs,
+    rebuild_jobs_history,
+    snapshot_artifacts,
+    run_parallel,
+    update_jobs_history,
+)
+from models import PipelineState, SourceFingerprint
+from schema import transform_columns
 
 from google.cloud import storage
 
@@ -27,6 +55,13 @@ from google.cloud import storage
 logging.getLogger().setLevel(logging.INFO)
 _logger = logging.getLogger(__name__)
 
+# Force a full (non-delta) fetch at least this often
+FULL_REFRESH_INTERVAL = timedelta(days=int(os.environ.get("FULL_REFRESH_DAYS", "7")))
+# Seconds a run may spend fetching before checkpointing and stopping (0 = no limit)
+FETCH_TIME_BUDGET = float(os.environ.get("FETCH_TIME_BUDGET", "0"))
+# Raw snapshots reprocess_all processes concurrently
+REPROCESS_WORKERS = int(os.environ.get("REPROCESS_WORKERS", "4"))
+
 
 def log(message: str, level: str = "info", **fields: Any) -> None:
     """Log a JSON-structured message for Cloud Logging."""
@@ -42,7 +77,7 @@ def log(message: str, level: str = "info", **fields: Any) -> None:
 
 def get_bucket() -> storage.Bucket:
     """Get the GCS bucket."""
-    client = storage.Client()
+    client = get_storage_client()
     bucket_name = os.environ.get("GCS_BUCKET")
     if not bucket_name:
         raise RuntimeError("GCS_BUCKET environment variable is required")
@@ -63,45 +98,80 @@ def update_state(bucket: storage.Bucket, state: PipelineState) -> None:
     blob = bucket.blob("metadata.json")
     content = state.to_json()
     blob.upload_from_string(content, content_type="application/json")
+    store("source_fingerprint", state.source_fingerprint)
     log("State updated", content=content)
 
 
+def get_source_fingerprint(bucket: storage.Bucket) -> SourceFingerprint | None:
+    """
+    The source fingerprint from the pipeline state, cached in the warm instance.
+
+    update_state keeps it current, so warm polls read nothing from GCS.
+    """
+    return cached("source_fingerprint", lambda: get_state(bucket).source_fingerprint)
+
+
 @functions_framework.http
 def main(request: Request) -> tuple[str, int]:
     """Route to appropriate handler based on action param."""
-    action = request.args.get("action", "")
-    if not action:
-        try:
-            body = request.get_json(silent=True) or {}
-            action = body.get("action", "latest")
-        except Exception:
-            action = "latest"
+    try:
+        body = request.get_json(silent=True) or {}
+    except Exception:
+        body = {}
+    action = request.args.get("action") or body.get("action", "latest")
+    force = str(request.args.get("force", body.get("force", ""))).lower() == "true"
 
-    log("Starting pipeline", action=action)
+    log("Starting pipeline", action=action, force=force)
 
     try:
         if action == "reprocess_all":
-            return reprocess_all()
+            return reprocess_all(force=force)
         else:
             return process_latest()
     except Exception as e:
         log("Pipeline failed", level="exception", error=str(e))
+        # Don't carry possibly-broken clients or credentials into the next run
+        invalidate()
         return f"Error: {e}", 500
+    finally:
+        log("Client setup", timings=pop_timings())
 
 
 def process_latest() -> tuple[str, int]:
     """
     Normal operation: fetch new data if available, then process.
 
-    1. Fetch 1 record to get process_date (lightweight check)
-    2. Check if raw file with that process_date already exists
-    3. If not, fetch full dataset and process
+    1. Check for changes (conditional metadata request, then an aggregate
+       fingerprint that includes process_date); stop if unchanged. The
+       previous fingerprint is cached, so metadata.json is only read on a
+       cold start or when the data changed
+    2. Check if raw file (or alias) with that process_date already exists
+    3. If not, fetch the dataset (delta since the last snapshot when possible,
+       full refresh every FULL_REFRESH_INTERVAL)
+    4. If the rows hash the same as the current snapshot, record the new
+       process_date as an alias of it and stop; otherwise process the fetched
+       rows straight from memory (the raw upload is only for archival)
+
+    Full fetches are checkpointed to raw/_partial/cursor.json as they go
+    (see fetch_jobs_checkpointed), so an interrupted or time-boxed fetch
+    resumes on the next run.
     """
     bucket = get_bucket()
+    previous = get_source_fingerprint(bucket)
+
+    changed, fingerprint = check_for_changes(get_client(), previous)
+    if not changed:
+        log("No new data (dataset unchanged)")
+        if fingerprint != previous:
+            # Save refreshed validators so the next poll gets a 304
+            state = get_state(bucket)
+            state.source_fingerprint = fingerprint
+            update_state(bucket, state)
+        return "No new data", 200
+
     state = get_state(bucket)
 
-    # Fetch 1 record to get the actual process_date
-    process_date_str = get_current_process_date()
+    process_date_str = fingerprint.process_date
     if not process_date_str:
         log("Could not get process_date from Socrata", level="error")
         return "Error: could not get process_date", 500
@@ -111,28 +181,107 @@ def process_latest() -> tuple[str, int]:
     log(f"Current process_date: {process_date.isoformat()}")
 
     # Check if we already have this process_date
-    raw_path = f"raw/{process_date.isoformat()}.json"
+    raw_path = f"raw/{process_date.isoformat()}.{FETCH_FORMAT}"
     raw_blob = bucket.blob(raw_path)
 
-    if raw_blob.exists():
+    if raw_blob.exists() or process_date.isoformat() in state.snapshot_aliases:
         log("No new data (process_date already exists)", process_date=process_date)
+        state.source_fingerprint = fingerprint
+        update_state(bucket, state)
         return "No new data", 200
 
-    # New data - fetch full dataset
+    # New data - fetch changes since the last snapshot, or the full dataset
     log(f"New process_date, fetching to {raw_path}")
+    now = datetime.now(timezone.utc)
+
+    # Rows fetched in this run, handed to the transform in memory
+    pages = None
+    if FETCH_FORMAT == "csv":
+        result = fetch_jobs_csv(raw_blob)
+    else:
+        pages = ArrowPages(transform_columns())
+        delta = state.can_fetch_delta(now, FULL_REFRESH_INTERVAL, transform_columns())
+        result = fetch_jobs(
+            raw_blob,
+            bucket.blob(state.raw_path()) if delta else None,
+            state.delta_watermark if delta else None,
+            cursor=load_cursor(bucket),
+            on_checkpoint=lambda cursor: save_cursor(bucket, cursor),
+            deadline=(
+                time.monotonic() + FETCH_TIME_BUDGET if FETCH_TIME_BUDGET else None
+            ),
+            previous_hash=state.content_hash if state.source_updated_at else None,
+            on_page=pages.add,
+        )
+    if not result.complete:
+        log(
+            "Fetch checkpointed, will resume",
+            record_count=result.record_count,
+            page_sizes=result.page_sizes,
+            throttle_waits=result.throttle_waits,
+            throttle_seconds=result.throttle_seconds,
+        )
+        return "Fetch in progress", 202
+
+    log(
+        "Fetched raw snapshot",
+        record_count=result.record_count,
+        delta=result.delta,
+        watermark=result.watermark,
+        bytes_received=result.bytes_received,
+        page_sizes=result.page_sizes,
+        throttle_waits=result.throttle_waits,
+        throttle_seconds=result.throttle_seconds,
+        content_hash=result.content_hash,
+    )
+
+    if result.unchanged:
+        # Same rows under a new process_date: keep serving the previous
+        # snapshot. The delta watermark stays put so the next delta still
+        # picks up the rows whose process_date was rewritten.
+        log(
+            "No new data (rows unchanged, recorded as alias)",
+            process_date=process_date,
+            alias_of=state.source_updated_at,
+        )
+        state.snapshot_aliases[process_date.isoformat()] = (
+            state.source_updated_at.isoformat()
+        )
+        state.last_fetched_at = now
+        state.source_fingerprint = fingerprint
+        update_state(bucket, state)
+        return "No new data", 200
+
     state.source_updated_at = process_date
-    state.last_fetched_at = datetime.now(timezone.utc)
-    fetch_jobs(raw_blob)
+    state.last_fetched_at = now
+    state.record_count = result.record_count
+    state.delta_watermark = result.watermark
+    state.source_fingerprint = fingerprint
+    state.fetch_columns = result.columns
+    state.raw_format = FETCH_FORMAT
+    state.content_hash = result.content_hash
+    if not result.delta:
+        state.last_full_fetch_at = now
 
     # Process
     parquet_path = f"processed/{process_date.isoformat()}.parquet"
     log(f"Processing {raw_path} -> {parquet_path}")
     state.last_processed_at = datetime.now(timezone.utc)
-    process_jobs(bucket, raw_path, parquet_path)
+    # A resumed fetch only has this run's pages in memory, and a delta that fell
+    # back to a full fetch has extra ones; read those from GCS
+    in_memory = pages is not None and pages.num_rows == result.record_count
+    process_jobs(
+        bucket, raw_path, parquet_path, pages=pages.table() if in_memory else None
+    )
+    state.fts_path = fts_index_path(parquet_path)
+    state.database_path = database_path(parquet_path)
+    state.list_path = list_path(parquet_path)
+    state.detail_path = detail_path(parquet_path)
+    state.facets_path = facets_path(parquet_path)
 
     # Update jobs_history
-    log("Updating jobs_history.parquet")
-    update_jobs_history(bucket)
+    log("Updating jobs_history/")
+    update_jobs_history(bucket, parquet_path)
 
     update_state(bucket, state)
 
@@ -140,61 +289,104 @@ def process_latest() -> tuple[str, int]:
     return "OK", 200
 
 
-def reprocess_all() -> tuple[str, int]:
+def reprocess_all(force: bool = False) -> tuple[str, int]:
     """
-    Reprocess all raw snapshots.
-
-    1. List all files in raw/
-    2. Delete all files in processed/
-    3. For each raw file, process it
-    4. Update metadata.json with latest
+    Reprocess raw snapshots whose processed file is out of date.
+
+    1. List all files in raw/ and processed/
+    2. Pick raw files whose processed file or artifacts (FTS index,
+       database, list and detail files, facets) are missing, or whose
+       processed file has a different build fingerprint (raw blob,
+       transform.sql, DuckDB version, output settings), or all of them if
+       force
+    3. Delete processed files and artifacts without a raw file
+    4. Process the picked raw files in parallel (REPROCESS_WORKERS)
+    5. Rebuild jobs_history once, if anything changed
+    6. Update metadata.json with latest
     """
     bucket = get_bucket()
     existing_state = get_state(bucket)
 
-    # List raw files
-    raw_blobs = list(bucket.list_blobs(prefix="raw/"))
+    # List raw files (skipping pages of unfinished fetches)
+    raw_blobs = [
+        blob
+        for blob in bucket.list_blobs(prefix="raw/")
+        if not blob.name.startswith(PARTIAL_PREFIX)
+    ]
     if not raw_blobs:
         log("No raw files to process")
         return "No raw files to process", 200
 
-    log(f"Found {len(raw_blobs)} raw files to reprocess")
-
-    # Delete all processed files
-    processed_blobs = list(bucket.list_blobs(prefix="processed/"))
-    for blob in processed_blobs:
-        log(f"Deleting {blob.name}")
-        blob.delete()
-    log(f"Deleted {len(processed_blobs)} processed files")
-
-    # Process each raw file
-    latest_timestamp = None
+    log(f"Found {len(raw_blobs)} raw files")
+
+    # Compare each raw file's fingerprint with its processed file's metadata
+    processed_blobs = {
+        blob.name: blob for blob in bucket.list_blobs(prefix="processed/")
+    }
+    artifact_names = {
+        blob.name
+        for prefix in ARTIFACT_PREFIXES
+        for blob in bucket.list_blobs(prefix=prefix)
+    }
+    paths = []
     for raw_blob in sorted(raw_blobs, key=lambda b: b.name):
-        # Extract timestamp from filename: raw/2026-01-20T20:00:31+00:00.json
-        timestamp_str = raw_blob.name.replace("raw/", "").replace(".json", "")
+        # Extract timestamp from filename: raw/2026-01-20T20:00:31+00:00.ndjson
+        timestamp_str, raw_format = raw_blob.name.removeprefix("raw/").rsplit(".", 1)
         parquet_path = f"processed/{timestamp_str}.parquet"
+        processed_blob = processed_blobs.pop(parquet_path, None)
+        artifacts = set(snapshot_artifacts(parquet_path))
+        missing_artifacts = artifacts - artifact_names
+        artifact_names -= artifacts
+        if (
+            force
+            or processed_blob is None
+            or missing_artifacts
+            or processed_blob.metadata != build_fingerprint(raw_blob)
+        ):
+            paths.append((raw_blob.name, parquet_path))
+    latest_timestamp, latest_format = timestamp_str, raw_format
+    log(f"{len(raw_blobs) - len(paths)} processed files are up to date", force=force)
+
+    # Delete processed files and artifacts whose raw file is gone
+    orphans = [*processed_blobs.values()]
+    orphans += [bucket.blob(name) for name in sorted(artifact_names)]
+    for blob in orphans:
+        log(f"Deleting {blob.name}")
+        blob.delete()
 
-        log(f"Processing {raw_blob.name} -> {parquet_path}")
-        process_jobs(bucket, raw_blob.name, parquet_path)
-
-        latest_timestamp = timestamp_str
+    log(f"Processing {len(paths)} raw files with {REPROCESS_WORKERS} workers")
+    start = time.monotonic()
+    processed = run_parallel(
+        lambda path: process_jobs(bucket, *path), paths, REPROCESS_WORKERS
+    )
+    for done, (raw_path, parquet_path) in enumerate(processed, 1):
+        log(
+            f"Processed {raw_path} -> {parquet_path} ({done}/{len(paths)})",
+            elapsed_seconds=round(time.monotonic() - start, 1),
+        )
 
     # Rebuild jobs_history from all processed files
-    log("Rebuilding jobs_history.parquet")
-    rebuild_jobs_history(bucket)
+    if paths or orphans or force:
+        log("Rebuilding jobs_history/")
+        rebuild_jobs_history(bucket)
 
     # Update metadata with latest
-    if latest_timestamp:
-        state = PipelineState(
-            source_updated_at=datetime.fromisoformat(latest_timestamp),
-            last_fetched_at=existing_state.last_fetched_at,
-            last_processed_at=datetime.now(timezone.utc),
-            record_count=None,
-        )
-        update_state(bucket, state)
+    state = replace(
+        existing_state,
+        source_updated_at=datetime.fromisoformat(latest_timestamp),
+        last_processed_at=datetime.now(timezone.utc),
+        record_count=None,
+        raw_format=latest_format,
+        fts_path=fts_index_path(f"processed/{latest_timestamp}.parquet"),
+        database_path=database_path(f"processed/{latest_timestamp}.parquet"),
+        list_path=list_path(f"processed/{latest_timestamp}.parquet"),
+        detail_path=detail_path(f"processed/{latest_timestamp}.parquet"),
+        facets_path=facets_path(f"processed/{latest_timestamp}.parquet"),
+    )
+    update_state(bucket, state)
 
-    log(f"Reprocessed {len(raw_blobs)} files")
-    return f"Reprocessed {len(raw_blobs)} files", 200
+    log(f"Reprocessed {len(paths)} of {len(raw_blobs)} files")
+    return f"Reprocessed {len(paths)} of {len(raw_blobs)} files", 200
 
 
 # For local development
@@ -211,10 +403,11 @@ if __name__ == "__main__":
         def get_json(self, silent: bool = False) -> dict:
             return {}
 
-    # Parse action from command line
+    # Parse action (and optional "force") from command line
     action = "latest"
     if len(sys.argv) > 1:
         action = sys.argv[1]
+    force = "true" if "force" in sys.argv[2:] else "false"
 
-    result, status = main(FakeRequest({"action": action}))
+    result, status = main(FakeRequest({"action": action, "force": force}))
     print(f"Result: {result} (status {status})")
@@ -1,9 +1,41 @@
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 
 from mashumaro.mixins.json import DataClassJSONMixin
 
 
+@dataclass
+class SourceFingerprint(DataClassJSONMixin):
+    """Change-detection markers for the Socrata dataset."""
+
+    etag: str | None  # metadata endpoint ETag, sent back as If-None-Match
+    last_modified: str | None  # sent back as If-Modified-Since
+    data_updated_at: str | None  # metadata dataUpdatedAt
+    row_count: int | None = None
+    max_posting_updated: str | None = None
+    process_date: str | None = None
+
+    def same_data(self, other: "SourceFingerprint | None") -> bool:
+        """Whether the aggregate fingerprint matches another one."""
+        return other is not None and (
+            self.row_count,
+            self.max_posting_updated,
+            self.process_date,
+        ) == (other.row_count, other.max_posting_updated, other.process_date)
+
+
+@dataclass
+class FetchCursor(DataClassJSONMixin):
+    """Progress of a checkpointed fetch into raw/_partial/."""
+
+    raw_path: str  # raw snapshot being assembled
+    watermark: str | None  # Socrata max(:updated_at) when the fetch started
+    pages: int = 0  # pages committed under the partial prefix
+    last_id: str | None = None  # :id of the last committed row
+    record_count: int = 0
+    content_hash: str | None = None  # content hash of the committed rows
+
+
 @dataclass
 class PipelineState(DataClassJSONMixin):
     """Metadata about the pipeline state."""
@@ -12,12 +44,25 @@ class PipelineState(DataClassJSONMixin):
     last_fetched_at: datetime | None
     last_processed_at: datetime | None
     record_count: int | None
+    delta_watermark: str | None = None  # Socrata max(:updated_at) at last fetch
+    last_full_fetch_at: datetime | None = None
+    source_fingerprint: SourceFingerprint | None = None
+    fetch_columns: list[str] | None = None  # raw columns in the current raw file
+    raw_format: str = "json"  # raw file extension: "ndjson", "csv" or legacy "json"
+    content_hash: str | None = None  # order-independent hash of the raw rows
+    # process_date (ISO) -> source_updated_at of the snapshot with the same rows
+    snapshot_aliases: dict[str, str] = field(default_factory=dict)
+    fts_path: str | None = None  # FTS index of the current snapshot, if built
+    database_path: str | None = None  # .duckdb of the current snapshot, if built
+    list_path: str | None = None  # current snapshot without the detail columns
+    detail_path: str | None = None  # its detail columns by id, fetched per job
+    facets_path: str | None = None  # its filter values, counts and histograms
 
     def raw_path(self) -> str | None:
         """Get raw file path based on source_updated_at timestamp."""
         if not self.source_updated_at:
             return None
-        return f"raw/{self.source_updated_at.isoformat()}.json"
+        return f"raw/{self.source_updated_at.isoformat()}.{self.raw_format}"
 
     def parquet_path(self) -> str | None:
         """Get processed file path based on source_updated_at timestamp."""
@@ -25,6 +70,19 @@ class PipelineState(DataClassJSONMixin):
             return None
         return f"processed/{self.source_updated_at.isoformat()}.parquet"
 
+    def can_fetch_delta(
+        self, now: datetime, full_refresh_interval: timedelta, columns: list[str]
+    ) -> bool:
+        """Whether the next fetch can be a delta on top of the current raw file."""
+        return (
+            self.source_updated_at is not None
+            and self.raw_format == "ndjson"
+            and self.fetch_columns == columns
+            and self.delta_watermark is not None
+            and self.last_full_fetch_at is not None
+            and now - self.last_full_fetch_at < full_refresh_interval
+        )
+
     @classmethod
     def empty(cls) -> "PipelineState":
         """Create an empty state for first run."""
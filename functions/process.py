@@ -2,112 +2,881 @@
 DuckDB processing logic.
 """
 
+import hashlib
+import json
 import logging
+import os
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import TypeVar
 
 import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
 from google.cloud import storage
 
+from clients import cached
+from schema import (
+    CSV_COLUMNS,
+    CSV_TIMESTAMP_FORMATS,
+    LARGE_TEXT_COLUMNS,
+    RAW_TYPES,
+    TIMESTAMP_COLUMNS,
+    TRANSFORM_SQL_PATH,
+    transform_columns,
+)
+
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 PARQUET_FORMAT = "FORMAT PARQUET, COMPRESSION ZSTD"
+# Layout of processed snapshots, which clients range-read over HTTP (see
+# scripts/bench_layout.py). Rows are clustered by the columns the UI sorts
+# and filters on, so a page of results lives in one row group; 2048 rows is
+# the smallest group DuckDB writes. Bloom filters are only written for
+# dictionary-encoded chunks, so the dictionary limit covers a whole group to
+# give id and job_id lookups one. Snapshots are written once and read many
+# times, so they get a higher ZSTD level than the other outputs.
+PROCESSED_ORDER = "posted_date DESC, agency, posting_type"
+PROCESSED_ZSTD_LEVEL = 12
+PROCESSED_FORMAT = (
+    f"{PARQUET_FORMAT}, COMPRESSION_LEVEL {PROCESSED_ZSTD_LEVEL}, "
+    "ROW_GROUP_SIZE 2048, DICTIONARY_SIZE_LIMIT 2048"
+)
+# Interval (SCD2) history: one row per distinct version of a posting, valid
+# for snapshots in [valid_from, valid_to). Versions still in the latest
+# snapshot are in HISTORY_OPEN; closed ones are appended by month of
+# valid_to and compacted per month. HISTORY_SNAPSHOTS lists every snapshot.
+HISTORY_PREFIX = "jobs_history/"
+HISTORY_OPEN = f"{HISTORY_PREFIX}open/current.parquet"
+HISTORY_SNAPSHOTS = f"{HISTORY_PREFIX}snapshots.parquet"
+HISTORY_CLOSED_PARTITION = f"{HISTORY_PREFIX}closed_month="
+HISTORY_COMPACTED = "compacted.parquet"
+# Full-text search index per snapshot: fts/<snapshot>.parquet holds BM25
+# postings (term, id, tf, len) over FTS_COLUMNS, with num_docs and avgdl as
+# Parquet key-value metadata. The client scores queries against it instead
+# of indexing in the browser (web/src/db.ts).
+FTS_PREFIX = "fts/"
+FTS_COLUMNS = ["business_title", "job_description", "agency", "civil_service_title"]
+FTS_OPTIONS = "stemmer = 'english', stopwords = 'english', lower = 1, strip_accents = 1"
+# How the client scores a search against the postings loaded as fts_postings
+# (with df per term): ftsScoresSql in web/src/db.ts, whose full query
+# db.test.ts pins. Format with search (escaped), num_docs and avgdl.
+CLIENT_FTS_SCORES_SQL = """
+WITH tokens AS (
+  SELECT DISTINCT stem(unnest(string_split_regex(
+    regexp_replace(lower(strip_accents('{search}')), '(\\.|[^a-z])+', ' ', 'g'),
+    '\\s+'
+  )), 'english') AS term
+)
+SELECT id, sum(
+  log(({num_docs} - df + 0.5) / (df + 0.5))
+    * (tf * (1.2 + 1))
+    / (tf + 1.2 * (1 - 0.75 + 0.75 * len / {avgdl}))
+) AS fts_score
+FROM fts_postings JOIN tokens USING (term)
+GROUP BY id
+"""
+# Split of each snapshot for the client: list/<snapshot>.parquet is the
+# processed file without DETAIL_COLUMNS (what the jobs table needs), and
+# detail/<snapshot>.parquet is id plus DETAIL_COLUMNS, sorted by id in
+# DETAIL_ROW_GROUP_SIZE-row groups with statistics only on id. Its footer is
+# then a small id -> row group index, so the job-detail view fetches one
+# posting's text with a single range request.
+LIST_PREFIX = "list/"
+DETAIL_PREFIX = "detail/"
+DETAIL_COLUMNS = LARGE_TEXT_COLUMNS
+DETAIL_ROW_GROUP_SIZE = 64
+# Filter widget data per snapshot: facets/<snapshot>.json holds each facet's
+# distinct values with counts (FACETS: name -> SQL expression, unnested for
+# list columns), salary histograms in SALARY_BIN_WIDTH bins and posting
+# counts per posted_date, so the client can populate filters without
+# scanning the jobs table
+FACETS_PREFIX = "facets/"
+FACETS = {
+    "agency": "agency",
+    "job_categories": "unnest(job_categories)",
+    "civil_service_title": "nullif(civil_service_title, '')",
+    "career_level": "career_level",
+    "posting_type": "posting_type",
+    "is_full_time": "is_full_time",
+    "requires_exam": "requires_exam",
+}
+SALARY_BIN_WIDTH = 10000
+# Ready-to-attach database per snapshot: db/<snapshot>.duckdb holds the jobs
+# table (indexed on DATABASE_INDEXES) and the FTS postings, so the client can
+# ATTACH it over HTTP instead of importing the Parquet file
+DATABASE_PREFIX = "db/"
+DATABASE_INDEXES = ["id", "job_id"]
+# Where each processed snapshot's artifacts live (see snapshot_artifacts)
+ARTIFACT_PREFIXES = [
+    FTS_PREFIX,
+    DATABASE_PREFIX,
+    LIST_PREFIX,
+    DETAIL_PREFIX,
+    FACETS_PREFIX,
+]
+# Extensions loaded into every database. deploy.sh bundles them into
+# EXTENSION_DIR (see scripts/bundle-duckdb-extensions.sh); without a bundle
+# (local dev) they're installed from the DuckDB repository as needed.
+EXTENSIONS = ["httpfs", "fts"]
+EXTENSION_DIR = Path(__file__).parent / "duckdb_extensions"
+# DuckDB resource settings (unset = DuckDB defaults)
+DUCKDB_THREADS = os.environ.get("DUCKDB_THREADS")
+DUCKDB_MEMORY_LIMIT = os.environ.get("DUCKDB_MEMORY_LIMIT")  # e.g. "768MB"
+
+
+def create_database() -> duckdb.DuckDBPyConnection:
+    """
+    Create the in-memory DuckDB database with EXTENSIONS loaded.
+
+    With a bundled EXTENSION_DIR, extensions are loaded from it and never
+    downloaded (autoinstall is off, so a missing one fails fast).
+    """
+    config = {}
+    if DUCKDB_THREADS:
+        config["threads"] = int(DUCKDB_THREADS)
+    if DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+    bundled = EXTENSION_DIR.is_dir()
+    if bundled:
+        config["extension_directory"] = str(EXTENSION_DIR)
+        config["autoinstall_known_extensions"] = False
+
+    conn = duckdb.connect(config=config)
+    for extension in EXTENSIONS:
+        if not bundled:
+            conn.execute(f"INSTALL {extension}")
+        conn.execute(f"LOAD {extension}")
+    return conn
+
+
+@contextmanager
+def connect() -> Iterator[duckdb.DuckDBPyConnection]:
+    """
+    Open a connection to the shared DuckDB database for one call.
+
+    The database (and httpfs) is set up once per container and cached like
+    the GCP clients. Each call gets its own cursor, so its temp tables are
+    private to it and dropped when it returns.
+    """
+    conn = cached("duckdb", create_database).cursor()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def raw_table_sql(raw_uri: str) -> str:
+    """
+    SQL that creates the `raw` table from a raw snapshot.
+
+    NDJSON snapshots are read with read_json and the declared RAW_TYPES of
+    :id and the columns used by transform.sql, so there is no sampling pass
+    and the file is parsed in parallel, one record at a time. Legacy JSON
+    array snapshots fall back to schema detection. CSV exports are read with
+    read_csv and an explicit all-VARCHAR schema, then renamed to API field
+    names with timestamps parsed, so transform.sql sees the same columns and
+    types either way.
+    """
+    if raw_uri.endswith(".ndjson"):
+        columns = ", ".join(
+            f"'{name}': '{RAW_TYPES[name]}'" for name in [":id", *transform_columns()]
+        )
+        return f"""
+        create or replace temp table raw as
+        from read_json(
+            '{raw_uri}',
+            format = 'newline_delimited',
+            columns = {{{columns}}}
+        )
+        """
+
+    if raw_uri.endswith(".csv"):
+        columns = ", ".join(f"'{header}': 'VARCHAR'" for header in CSV_COLUMNS)
+        formats = ", ".join(f"'{f}'" for f in CSV_TIMESTAMP_FORMATS)
+        select = ",\n            ".join(
+            (
+                f'strptime("{header}", [{formats}]) as {name}'
+                if name in TIMESTAMP_COLUMNS
+                else f'"{header}" as {name}'
+            )
+            for header, name in CSV_COLUMNS.items()
+        )
+        return f"""
+        create or replace temp table raw as
+        from read_csv(
+            '{raw_uri}',
+            header = true,
+            auto_detect = false,
+            delim = ',',
+            quote = '"',
+            escape = '"',
+            columns = {{{columns}}}
+        )
+        select
+            {select}
+        """
+
+    return f"""
+    create or replace temp table raw as
+    from read_json('{raw_uri}', maximum_object_size=16777216 * 2)
+    select *
+    """
+
+
+def raw_view_sql(name: str, columns: list[str]) -> str:
+    """SQL that creates the `raw` view over registered Arrow pages."""
+    select = ", ".join(f'cast("{c}" as {RAW_TYPES[c]}) as "{c}"' for c in columns)
+    return f"create or replace temp view raw as select {select} from {name}"
+
+
+class ArrowPages:
+    """
+    Fetched pages collected as Arrow record batches (see fetch_jobs on_page).
+
+    Columns are :id plus `columns`, all strings as Socrata sends them;
+    missing keys become nulls. raw_view_sql casts them to RAW_TYPES.
+    """
+
+    def __init__(self, columns: list[str]):
+        self.schema = pa.schema([(name, pa.string()) for name in [":id", *columns]])
+        self.batches: list[pa.RecordBatch] = []
+        self.num_rows = 0
+
+    def add(self, page: list[dict]) -> None:
+        """Convert a page of records and keep it."""
+        batch = pa.RecordBatch.from_pylist(page, schema=self.schema)
+        self.batches.append(batch)
+        self.num_rows += batch.num_rows
+
+    def table(self) -> pa.Table:
+        """All pages as one table (no copy)."""
+        return pa.Table.from_batches(self.batches, schema=self.schema)
+
+
+def fts_index_path(processed_path: str) -> str:
+    """Path of a processed snapshot's FTS index (fts/<snapshot>.parquet)."""
+    return FTS_PREFIX + processed_path.removeprefix("processed/")
+
+
+def write_facets(
+    conn: duckdb.DuckDBPyConnection, processed_file: Path, output: Path
+) -> None:
+    """
+    Write a processed file's facets as compact JSON.
+
+    {"record_count": n,
+     "facets": {name: [[value, count], ...]},  # by value, nulls left out
+     "salary_histogram": {"bin_width": w, column: [[bin_start, count], ...]},
+     "posted_date": [["YYYY-MM-DD", count], ...]}
+    """
+
+    def counts(expression: str) -> list[tuple]:
+        return conn.execute(
+            f"""
+            SELECT value, count(*) FROM (
+                SELECT {expression} AS value FROM '{processed_file}'
+            )
+            WHERE value IS NOT NULL
+            GROUP BY value
+            ORDER BY value
+            """
+        ).fetchall()
+
+    (record_count,) = conn.execute(
+        f"SELECT count(*) FROM '{processed_file}'"
+    ).fetchone()
+    facets = {
+        "record_count": record_count,
+        "facets": {
+            name: [list(row) for row in counts(expression)]
+            for name, expression in FACETS.items()
+        },
+        "salary_histogram": {
+            "bin_width": SALARY_BIN_WIDTH,
+            **{
+                column: [
+                    [int(start), count]
+                    for start, count in counts(
+                        f"floor({column} / {SALARY_BIN_WIDTH}) * {SALARY_BIN_WIDTH}"
+                    )
+                ]
+                for column in ("salary_range_from", "salary_range_to")
+            },
+        },
+        "posted_date": [
+            [value.isoformat(), count] for value, count in counts("posted_date")
+        ],
+    }
+    output.write_text(json.dumps(facets, separators=(",", ":")))
+
+
+def write_fts_index(
+    conn: duckdb.DuckDBPyConnection, processed_file: Path, output: Path
+) -> tuple[int, float]:
+    """
+    Build the BM25 index of a processed file and write its postings.
+
+    Uses PRAGMA create_fts_index with the settings the client used to index
+    with, so tokenizing, stemming, stopwords and scoring are unchanged. The
+    index is built under a unique table name (the fts schema is shared by
+    all cursors) and dropped afterwards. Returns (num_docs, avgdl).
+    """
+    table = f"fts_source_{uuid.uuid4().hex}"
+    index = f"fts_main_{table}"
+    columns = ", ".join(FTS_COLUMNS)
+    conn.execute(
+        f"CREATE TABLE {table} AS SELECT id, {columns} FROM '{processed_file}'"
+    )
+    try:
+        fields = ", ".join(f"'{column}'" for column in FTS_COLUMNS)
+        conn.execute(
+            f"PRAGMA create_fts_index('{table}', 'id', {fields}, {FTS_OPTIONS})"
+        )
+        num_docs, avgdl = conn.execute(
+            f"SELECT num_docs, avgdl FROM {index}.stats"
+        ).fetchone()
+        conn.execute(
+            f"""
+            COPY (
+                SELECT dict.term, docs.name AS id, count(*)::INTEGER AS tf,
+                    docs.len::INTEGER AS len
+                FROM {index}.terms AS terms
+                JOIN {index}.dict AS dict USING (termid)
+                JOIN {index}.docs AS docs USING (docid)
+                GROUP BY ALL
+                ORDER BY dict.term, id
+            ) TO '{output}' (
+                {PARQUET_FORMAT},
+                KV_METADATA {{num_docs: '{num_docs}', avgdl: '{avgdl}'}}
+            )
+            """
+        )
+        return num_docs, avgdl
+    finally:
+        conn.execute(f"DROP SCHEMA IF EXISTS {index} CASCADE")
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def database_path(processed_path: str) -> str:
+    """Path of a processed snapshot's database (db/<snapshot>.duckdb)."""
+    name = processed_path.removeprefix("processed/").removesuffix(".parquet")
+    return f"{DATABASE_PREFIX}{name}.duckdb"
+
+
+def list_path(processed_path: str) -> str:
+    """Path of a processed snapshot's list file (list/<snapshot>.parquet)."""
+    return LIST_PREFIX + processed_path.removeprefix("processed/")
+
+
+def detail_path(processed_path: str) -> str:
+    """Path of a processed snapshot's detail file (detail/<snapshot>.parquet)."""
+    return DETAIL_PREFIX + processed_path.removeprefix("processed/")
+
+
+def facets_path(processed_path: str) -> str:
+    """Path of a processed snapshot's facets (facets/<snapshot>.json)."""
+    name = processed_path.removeprefix("processed/").removesuffix(".parquet")
+    return f"{FACETS_PREFIX}{name}.json"
+
+
+def snapshot_artifacts(processed_path: str) -> list[str]:
+    """Paths of the files process_jobs writes next to a processed snapshot."""
+    return [
+        fts_index_path(processed_path),
+        database_path(processed_path),
+        list_path(processed_path),
+        detail_path(processed_path),
+        facets_path(processed_path),
+    ]
+
+
+def write_list_and_detail(
+    conn: duckdb.DuckDBPyConnection,
+    processed_file: Path,
+    list_output: Path,
+    detail_output: Path,
+) -> None:
+    """
+    Split a processed file into its list and detail files.
+
+    The list file keeps the processed layout (PROCESSED_ORDER and
+    PROCESSED_FORMAT). The detail file is written with pyarrow, since
+    DuckDB doesn't write row groups under 2048 rows; min/max statistics on
+    the other columns would only bloat the footer.
+    """
+    detail_columns = ", ".join(DETAIL_COLUMNS)
+    conn.execute(
+        f"COPY (SELECT * EXCLUDE ({detail_columns}) FROM '{processed_file}') "
+        f"TO '{list_output}' ({PROCESSED_FORMAT})"
+    )
+    detail = conn.execute(
+        f"SELECT id, {detail_columns} FROM '{processed_file}' ORDER BY id"
+    ).fetch_arrow_table()
+    pq.write_table(
+        detail,
+        detail_output,
+        row_group_size=DETAIL_ROW_GROUP_SIZE,
+        compression="zstd",
+        compression_level=PROCESSED_ZSTD_LEVEL,
+        write_statistics=["id"],
+    )
+
+
+def write_database(
+    conn: duckdb.DuckDBPyConnection,
+    list_file: Path,
+    fts_file: Path,
+    fts_stats: tuple[int, float],
+    output: Path,
+) -> None:
+    """
+    Write a snapshot's ready-to-attach DuckDB database.
+
+    Tables: jobs (the list file, with an ART index on each of
+    DATABASE_INDEXES for point lookups), fts_postings (the FTS index file
+    plus each term's df) and fts_stats (num_docs, avgdl), which is what the
+    client needs to score searches (see write_fts_index).
+    """
+    name = f"snapshot_{uuid.uuid4().hex}"
+    conn.execute(f"ATTACH '{output}' AS {name}")
+    try:
+        conn.execute(f"CREATE TABLE {name}.jobs AS SELECT * FROM '{list_file}'")
+        for column in DATABASE_INDEXES:
+            conn.execute(f"CREATE INDEX jobs_{column} ON {name}.jobs ({column})")
+        conn.execute(
+            f"""
+            CREATE TABLE {name}.fts_postings AS
+            SELECT *, count(*) OVER (PARTITION BY term) AS df
+            FROM '{fts_file}'
+            ORDER BY term, id
+            """
+        )
+        conn.execute(
+            f"CREATE TABLE {name}.fts_stats AS "
+            "SELECT ?::BIGINT AS num_docs, ?::DOUBLE AS avgdl",
+            list(fts_stats),
+        )
+    finally:
+        conn.execute(f"DETACH {name}")
+
+
+def build_fingerprint(raw_blob: storage.Blob) -> dict[str, str]:
+    """
+    Everything a processed file is built from, stored as its blob metadata.
+
+    Covers the raw blob (generation and checksum: MD5, or CRC32C for
+    composed objects, which have no MD5), transform.sql, the DuckDB version,
+    the snapshot layout, and the FTS index, database, detail file and
+    facets settings. A processed file whose metadata matches its raw blob's
+    fingerprint is up to date.
+    """
+    return {
+        "raw_generation": str(raw_blob.generation),
+        "raw_checksum": raw_blob.md5_hash or raw_blob.crc32c or "",
+        "transform_sha256": hashlib.sha256(TRANSFORM_SQL_PATH.read_bytes()).hexdigest(),
+        "duckdb_version": duckdb.__version__,
+        "parquet_format": f"{PROCESSED_FORMAT}; ORDER BY {PROCESSED_ORDER}",
+        "fts": f"{','.join(FTS_COLUMNS)}; {FTS_OPTIONS}",
+        "database_indexes": ",".join(DATABASE_INDEXES),
+        "detail": f"{','.join(DETAIL_COLUMNS)}; {DETAIL_ROW_GROUP_SIZE} rows",
+        "facets": f"{'; '.join(FACETS.values())}; bins of {SALARY_BIN_WIDTH}",
+    }
 
 
 def process_jobs(
-    bucket: storage.Bucket, raw_path: str, processed_path: str, local_dir=None
+    bucket: storage.Bucket,
+    raw_path: str,
+    processed_path: str,
+    local_dir=None,
+    pages: pa.Table | None = None,
 ) -> None:
     """
-    Process raw JSON with DuckDB and output Parquet.
+    Process raw JSON (or CSV export) with DuckDB and output Parquet.
+
+    Also writes the snapshot's artifacts (snapshot_artifacts: FTS index,
+    database, list and detail files, facets). All outputs' metadata is the
+    raw blob's build_fingerprint; the artifacts are uploaded first, so an
+    up-to-date processed file means they are there too.
     Args:
         bucket_name: GCS bucket name
-        raw_path: Path to raw JSON file in GCS (e.g., "raw/2025-01-07T06:00:00Z.json")
+        raw_path: Path to raw JSON/CSV file in GCS (e.g., "raw/2025-01-07T06:00:00Z.json")
         processed_path: Path to output Parquet file in GCS (e.g., "processed/2025-01-07T06:05:00Z.parquet")
         local_dir: Optional local directory for temporary files (defaults to TemporaryDirectory())
+        pages: Optional Arrow table of the raw snapshot's rows (see ArrowPages);
+            when given it is read in place instead of raw_path
 
     Returns:
         Path to the output Parquet file in GCS
     """
-    logger.info(f"Processing {raw_path}")
-
-    # Read from GCS
-    conn = duckdb.connect()
-    conn.execute("INSTALL httpfs; LOAD httpfs;")
+    source = "memory" if pages is not None else raw_path
+    logger.info(f"Processing {raw_path} (reading from {source})")
 
-    # Read raw JSON and transform
-    # sql = open("sql/transform.sql").read()
-    # result = conn.execute(sql.format(input_path=f"gs://{bucket_name}/{raw_path}"))
+    transform_sql = TRANSFORM_SQL_PATH.read_text()
+    fingerprint = build_fingerprint(bucket.get_blob(raw_path))
 
-    conn.execute(
-        f"""
-    create table raw as
-    from read_json('gs://{bucket.name}/{raw_path}', maximum_object_size=16777216 * 2)
-    select *
-    """
-    )
-
-    transform_sql = (Path(__file__).parent / "sql/transform.sql").read_text()
+    with connect() as conn, TemporaryDirectory(dir=local_dir) as tmpdir:
+        if pages is not None:
+            # Scanned in place: no GCS read-back or JSON parsing
+            conn.register("raw_pages", pages)
+            conn.execute(raw_view_sql("raw_pages", pages.column_names))
+        else:
+            # Read raw JSON/CSV from GCS
+            conn.execute(raw_table_sql(f"gs://{bucket.name}/{raw_path}"))
 
-    with TemporaryDirectory(dir=local_dir) as tmpdir:
         # Write Parquet to GCS
         local_output_path = Path(tmpdir) / processed_path
         local_output_path.parent.mkdir(parents=True)
         logger.info(f"Applying transformation and writing to {local_output_path}")
         # Write locally first, then upload (httpfs can't write to GCS without explicit creds)
         conn.execute(
-            f"COPY ({transform_sql}) TO '{local_output_path}' ({PARQUET_FORMAT})"
+            f"COPY (SELECT * FROM ({transform_sql}) ORDER BY {PROCESSED_ORDER}) "
+            f"TO '{local_output_path}' ({PROCESSED_FORMAT})"
         )
 
+        artifacts = snapshot_artifacts(processed_path)
+        fts_file, db_file, list_file, detail_file, facets_file = (
+            Path(tmpdir) / path for path in artifacts
+        )
+        logger.info(f"Building artifacts for {processed_path}")
+        for path in (fts_file, db_file, list_file, detail_file, facets_file):
+            path.parent.mkdir(parents=True)
+        write_list_and_detail(conn, local_output_path, list_file, detail_file)
+        write_facets(conn, local_output_path, facets_file)
+        fts_stats = write_fts_index(conn, local_output_path, fts_file)
+        write_database(conn, list_file, fts_file, fts_stats, db_file)
+        for path in artifacts:
+            blob = bucket.blob(path)
+            blob.metadata = fingerprint
+            content_type = "application/octet-stream"
+            if path.endswith(".json"):
+                content_type = "application/json"
+            blob.upload_from_filename(Path(tmpdir) / path, content_type=content_type)
+            logger.info(f"Uploaded to gs://{bucket.name}/{path}")
+
         processed_blob = bucket.blob(processed_path)
+        processed_blob.metadata = fingerprint
         processed_blob.upload_from_filename(
             local_output_path, content_type="application/octet-stream"
         )
         logger.info(f"Uploaded to gs://{bucket.name}/{processed_path}")
 
 
-def update_jobs_history(bucket: storage.Bucket) -> None:
+def run_parallel(
+    task: Callable[[T], None], items: list[T], workers: int
+) -> Iterator[T]:
+    """
+    Run task on each item on a pool of worker threads, yielding items in
+    input order as they finish (so progress is reported in order).
+
+    Workers share the cached DuckDB database, each through its own cursor,
+    and take one item at a time, so at most `workers` snapshots are in
+    flight. DuckDB's memory_limit (DUCKDB_MEMORY_LIMIT) is per database, so
+    each worker is bounded by it divided by `workers`; beyond that, DuckDB
+    spills to disk. The first failure is raised and unstarted items are
+    cancelled.
+    """
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="process")
+    try:
+        futures = [executor.submit(task, item) for item in items]
+        for item, future in zip(items, futures):
+            future.result()
+            yield item
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def snapshot_sql(path: str) -> str:
+    """SQL for the snapshot timestamp in a processed file name (path expression)."""
+    name = rf"regexp_extract({path}, '([^/]+)\+00:00\.parquet$', 1)"
+    return f"cast({name} AS timestamp)"
+
+
+def versions_sql(sources: list[str]) -> str:
+    """
+    SQL for the distinct posting versions in processed snapshot files.
+
+    Rows keep the history columns (processed columns minus large text,
+    processed_date and id, which hashes the whole row including
+    processed_date) plus the snapshot they came from. version_hash is the
+    hash of the history columns, so it identifies job_id plus content.
+    """
+    files = ", ".join(f"'{source}'" for source in sources)
+    excluded = ", ".join(["filename", "id", "processed_date", *LARGE_TEXT_COLUMNS])
+    return f"""
+    SELECT DISTINCT
+        md5(row(*COLUMNS(* EXCLUDE (snapshot)))::varchar) AS version_hash, *
+    FROM (
+        SELECT {snapshot_sql("filename")} AS snapshot, * EXCLUDE ({excluded})
+        FROM read_parquet([{files}], filename = true)
+    )
+    """
+
+
+def history_snapshots_sql(sources: list[str]) -> str:
+    """
+    SQL for the snapshot of every processed file, in order.
+
+    Taken from the file names rather than from the versions in them, so a
+    snapshot that opens or closes nothing is still listed, as it is when
+    update_jobs_history applies it.
+    """
+    files = ", ".join(f"'{source}'" for source in sources)
+    return f"""
+    SELECT DISTINCT {snapshot_sql("source")} AS snapshot
+    FROM unnest([{files}]) AS sources(source)
+    ORDER BY snapshot
+    """
+
+
+def history_intervals_sql(sources: list[str]) -> str:
+    """
+    SQL building the interval history from scratch over processed files.
+
+    A version that disappears and comes back gets one interval per run of
+    consecutive snapshots; valid_to is the first snapshot without it.
+    """
+    return f"""
+    WITH versions AS ({versions_sql(sources)}),
+    snapshots AS (
+        SELECT snapshot, row_number() OVER (ORDER BY snapshot) AS n
+        FROM ({history_snapshots_sql(sources)})
+    ),
+    islands AS (
+        SELECT
+            versions.* EXCLUDE (snapshot),
+            snapshot,
+            n,
+            n - row_number() OVER (PARTITION BY version_hash ORDER BY n) AS island
+        FROM versions JOIN snapshots USING (snapshot)
+    ),
+    intervals AS (
+        SELECT
+            COLUMNS(* EXCLUDE (snapshot, n)),
+            min(snapshot) AS valid_from,
+            max(n) AS last_n
+        FROM islands
+        GROUP BY ALL
+    )
+    SELECT intervals.* EXCLUDE (island, last_n), snapshots.snapshot AS valid_to
+    FROM intervals LEFT JOIN snapshots ON snapshots.n = intervals.last_n + 1
+    """
+
+
+def history_daily_sql(prefix: str) -> str:
+    """
+    SQL expanding the interval history under prefix (e.g. gs://bucket/) back
+    to one row per posting per snapshot, like the old per-snapshot history.
+    """
+    return f"""
+    SELECT
+        snapshots.snapshot::date AS processed_date,
+        history.* EXCLUDE (valid_from, valid_to)
+    FROM read_parquet(
+        '{prefix}{HISTORY_PREFIX}*/*.parquet', hive_partitioning = false
+    ) AS history
+    JOIN read_parquet('{prefix}{HISTORY_SNAPSHOTS}') AS snapshots
+        ON snapshots.snapshot >= history.valid_from
+        AND (history.valid_to IS NULL OR snapshots.snapshot < history.valid_to)
     """
-    Update jobs_history.parquet from all processed files.
 
-    If jobs_history.parquet doesn't exist, creates it.
-    If it exists, rebuilds it from all processed/* files.
+
+def apply_snapshot_sql(
+    conn: duckdb.DuckDBPyConnection, open_source: str, processed_source: str
+) -> tuple[str, str]:
     """
-    history_blob = bucket.blob("jobs_history.parquet")
-    glob_pattern = f"gs://{bucket.name}/processed/*.parquet"
+    Stage one new snapshot against the open versions.
 
-    conn = duckdb.connect()
-    conn.execute("INSTALL httpfs; LOAD httpfs;")
+    Returns SQL for (versions closed by it, new open versions). Versions in
+    both stay open; open ones missing from the snapshot are closed with
+    valid_to = snapshot; new ones open with valid_from = snapshot. Applying
+    the same snapshot twice closes nothing and leaves the open set unchanged.
+    """
+    snapshot = snapshot_sql(f"'{processed_source}'")
+    conn.execute(
+        "CREATE OR REPLACE TEMP TABLE new_versions AS "
+        f"SELECT * EXCLUDE (snapshot) FROM ({versions_sql([processed_source])})"
+    )
+    conn.execute(
+        "CREATE OR REPLACE TEMP TABLE open_versions AS "
+        f"FROM read_parquet('{open_source}')"
+    )
+    closed = f"""
+    SELECT * REPLACE ({snapshot} AS valid_to)
+    FROM open_versions ANTI JOIN new_versions USING (version_hash)
+    """
+    still_open = f"""
+    SELECT * FROM open_versions SEMI JOIN new_versions USING (version_hash)
+    UNION ALL BY NAME
+    SELECT *, {snapshot} AS valid_from, NULL::timestamp AS valid_to
+    FROM new_versions ANTI JOIN open_versions USING (version_hash)
+    """
+    return closed, still_open
 
-    # Columns to exclude (large text fields)
-    exclude_cols = "job_description, minimum_qual_requirements, residency_requirement"
 
+def copy_to_blob(
+    conn: duckdb.DuckDBPyConnection,
+    query: str,
+    blob: storage.Blob,
+    metadata: dict | None = None,
+) -> None:
+    """Write a query's result to a blob as Parquet (via a local file)."""
     with TemporaryDirectory() as tmpdir:
-        local_output = Path(tmpdir) / "jobs_history.parquet"
+        local_output = Path(tmpdir) / "output.parquet"
+        conn.execute(f"COPY ({query}) TO '{local_output}' ({PARQUET_FORMAT})")
+        blob.metadata = metadata
+        blob.upload_from_filename(local_output, content_type="application/octet-stream")
 
-        logger.info(f"Building jobs_history.parquet from {glob_pattern}")
-        conn.execute(
+
+def update_jobs_history(bucket: storage.Bucket, processed_path: str) -> None:
+    """
+    Apply one new processed snapshot to the interval history.
+
+    Only the open versions, the snapshot list and the versions closed by
+    this snapshot are written, so the cost doesn't grow with history length.
+    Completed months of closed versions are then compacted. If there is no
+    history yet, it is built from all processed files.
+    """
+    if not bucket.blob(HISTORY_OPEN).exists():
+        rebuild_jobs_history(bucket)
+        return
+
+    snapshot = processed_path.removeprefix("processed/").removesuffix(".parquet")
+    gcs = f"gs://{bucket.name}/"
+    with connect() as conn:
+        closed, still_open = apply_snapshot_sql(
+            conn, gcs + HISTORY_OPEN, gcs + processed_path
+        )
+        closed_count = conn.execute(f"SELECT count(*) FROM ({closed})").fetchone()[0]
+        # Written first: a retry after a failure recomputes the same closed set
+        if closed_count:
+            closed_path = f"{HISTORY_CLOSED_PARTITION}{snapshot[:7]}/{snapshot}.parquet"
+            copy_to_blob(conn, closed, bucket.blob(closed_path))
+        copy_to_blob(conn, still_open, bucket.blob(HISTORY_OPEN))
+        copy_to_blob(
+            conn,
             f"""
-            COPY (
-                SELECT * EXCLUDE({exclude_cols})
-                FROM read_parquet('{glob_pattern}')
-            ) TO '{local_output}' ({PARQUET_FORMAT})
-        """
+            SELECT DISTINCT snapshot FROM read_parquet('{gcs}{HISTORY_SNAPSHOTS}')
+            UNION SELECT {snapshot_sql(f"'{gcs}{processed_path}'")}
+            ORDER BY snapshot
+            """,
+            bucket.blob(HISTORY_SNAPSHOTS),
         )
+    logger.info(f"Applied {snapshot} to jobs_history ({closed_count} versions closed)")
+
+    compact_jobs_history(bucket)
 
-        history_blob.upload_from_filename(
-            local_output, content_type="application/octet-stream"
+
+def compact_jobs_history(bucket: storage.Bucket) -> None:
+    """
+    Merge the files of each completed month of closed versions into one.
+
+    Every month but the latest is compacted into HISTORY_COMPACTED, whose
+    "sources" metadata lists the files it contains. Those files are deleted
+    only after it is written, and files it already contains are just
+    deleted, so an interrupted compaction never duplicates rows.
+    """
+    partitions: dict[str, list[storage.Blob]] = {}
+    for blob in bucket.list_blobs(prefix=HISTORY_CLOSED_PARTITION):
+        partition, _, name = blob.name.rpartition("/")
+        partitions.setdefault(partition, []).append(blob)
+
+    for partition in sorted(partitions)[:-1]:
+        files = partitions[partition]
+        compacted = next(
+            (b for b in files if b.name.endswith(f"/{HISTORY_COMPACTED}")), None
         )
-        logger.info(f"Updated gs://{bucket.name}/jobs_history.parquet")
+        dailies = [b for b in files if b is not compacted]
+        if not dailies:
+            continue
+
+        merged = set()
+        if compacted is not None and compacted.metadata:
+            merged = set(compacted.metadata.get("sources", "").split(","))
+        new = [b for b in dailies if b.name.rpartition("/")[2] not in merged]
+        if new:
+            sources = ([compacted] if compacted is not None else []) + new
+            merged |= {b.name.rpartition("/")[2] for b in new}
+            with connect() as conn:
+                copy_to_blob(
+                    conn,
+                    "SELECT * FROM read_parquet(["
+                    + ", ".join(f"'gs://{bucket.name}/{b.name}'" for b in sources)
+                    + "], hive_partitioning = false)",
+                    bucket.blob(f"{partition}/{HISTORY_COMPACTED}"),
+                    {"sources": ",".join(sorted(merged - {""}))},
+                )
+            logger.info(f"Compacted {len(new)} files into {partition}/")
+
+        for blob in dailies:
+            blob.delete()
 
 
 def rebuild_jobs_history(bucket: storage.Bucket) -> None:
-    """Rebuild jobs_history.parquet from scratch."""
-    history_blob = bucket.blob("jobs_history.parquet")
-    if history_blob.exists():
-        history_blob.delete()
-        logger.info("Deleted existing jobs_history.parquet")
+    """
+    Rebuild the interval history from all processed files.
+
+    Writes the open versions, the snapshot list and one compacted file per
+    month of closed versions.
+    """
+    for blob in bucket.list_blobs(prefix=HISTORY_PREFIX):
+        blob.delete()
+    legacy_blob = bucket.blob("jobs_history.parquet")
+    if legacy_blob.exists():
+        legacy_blob.delete()
+        logger.info("Deleted legacy jobs_history.parquet")
+
+    sources = [
+        f"gs://{bucket.name}/{blob.name}"
+        for blob in bucket.list_blobs(prefix="processed/")
+    ]
+    if not sources:
+        logger.info("No processed files, jobs_history not built")
+        return
 
-    update_jobs_history(bucket)
+    with connect() as conn, TemporaryDirectory() as tmpdir:
+        conn.execute(
+            "CREATE OR REPLACE TEMP TABLE intervals AS "
+            + history_intervals_sql(sources)
+        )
+        copy_to_blob(
+            conn,
+            "SELECT * FROM intervals WHERE valid_to IS NULL",
+            bucket.blob(HISTORY_OPEN),
+        )
+        copy_to_blob(
+            conn, history_snapshots_sql(sources), bucket.blob(HISTORY_SNAPSHOTS)
+        )
+
+        # One file per month of valid_to, uploaded as that month's compacted file
+        closed_dir = Path(tmpdir) / "closed"
+        conn.execute(
+            f"""
+            COPY (
+                SELECT *, strftime(valid_to, '%Y-%m') AS closed_month
+                FROM intervals WHERE valid_to IS NOT NULL
+            ) TO '{closed_dir}' ({PARQUET_FORMAT}, PARTITION_BY (closed_month))
+            """
+        )
+        for local_file in sorted(closed_dir.glob("closed_month=*/*.parquet")):
+            month = local_file.parent.name.removeprefix("closed_month=")
+            bucket.blob(
+                f"{HISTORY_CLOSED_PARTITION}{month}/{HISTORY_COMPACTED}"
+            ).upload_from_filename(local_file, content_type="application/octet-stream")
+
+        counts = conn.execute(
+            "SELECT count(*), count(*) FILTER (valid_to IS NULL) FROM intervals"
+        ).fetchone()
+    logger.info(
+        f"Rebuilt jobs_history from {len(sources)} snapshots "
+        f"({counts[0]} versions, {counts[1]} open)"
+    )
 
 
 if __name__ == "__main__":
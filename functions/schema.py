@@ -0,0 +1,111 @@
+"""
+Socrata dataset columns and types, the subset used by transform.sql, and
+the CSV export layout.
+"""
+
+import re
+from functools import cache
+from pathlib import Path
+
+TRANSFORM_SQL_PATH = Path(__file__).parent / "sql/transform.sql"
+
+# Columns of the NYC Jobs dataset (kpav-sd4t), in API field order
+RAW_COLUMNS = [
+    "job_id",
+    "agency",
+    "posting_type",
+    "number_of_positions",
+    "business_title",
+    "civil_service_title",
+    "title_classification",
+    "title_code_no",
+    "level",
+    "job_category",
+    "full_time_part_time_indicator",
+    "career_level",
+    "salary_range_from",
+    "salary_range_to",
+    "salary_frequency",
+    "work_location",
+    "division_work_unit",
+    "job_description",
+    "minimum_qual_requirements",
+    "preferred_skills",
+    "additional_information",
+    "to_apply",
+    "hours_shift",
+    "work_location_1",
+    "recruitment_contact",
+    "residency_requirement",
+    "posting_date",
+    "post_until",
+    "posting_updated",
+    "process_date",
+]
+
+# Large free-text columns (most of the payload, excluded from jobs_history)
+LARGE_TEXT_COLUMNS = [
+    "job_description",
+    "minimum_qual_requirements",
+    "residency_requirement",
+]
+
+# Columns Socrata rewrites on every publish even when the row is otherwise
+# unchanged; left out of the snapshot content hash
+VOLATILE_COLUMNS = ["process_date"]
+
+# Bulk CSV export (/api/views/<id>/rows.csv) header -> API field name, in
+# file order. The export uses display names and US-style timestamps.
+CSV_COLUMNS = {
+    "Job ID": "job_id",
+    "Agency": "agency",
+    "Posting Type": "posting_type",
+    "# Of Positions": "number_of_positions",
+    "Business Title": "business_title",
+    "Civil Service Title": "civil_service_title",
+    "Title Classification": "title_classification",
+    "Title Code No": "title_code_no",
+    "Level": "level",
+    "Job Category": "job_category",
+    "Full-Time/Part-Time indicator": "full_time_part_time_indicator",
+    "Career Level": "career_level",
+    "Salary Range From": "salary_range_from",
+    "Salary Range To": "salary_range_to",
+    "Salary Frequency": "salary_frequency",
+    "Work Location": "work_location",
+    "Division/Work Unit": "division_work_unit",
+    "Job Description": "job_description",
+    "Minimum Qual Requirements": "minimum_qual_requirements",
+    "Preferred Skills": "preferred_skills",
+    "Additional Information": "additional_information",
+    "To Apply": "to_apply",
+    "Hours/Shift": "hours_shift",
+    "Work Location 1": "work_location_1",
+    "Recruitment Contact": "recruitment_contact",
+    "Residency Requirement": "residency_requirement",
+    "Posting Date": "posting_date",
+    "Post Until": "post_until",
+    "Posting Updated": "posting_updated",
+    "Process Date": "process_date",
+}
+
+# Socrata floating timestamp columns
+TIMESTAMP_COLUMNS = ["posting_date", "posting_updated", "process_date"]
+
+# DuckDB type of each raw column, used to read raw files without schema
+# detection. Socrata sends every value as a JSON string.
+RAW_TYPES = {
+    ":id": "VARCHAR",
+    **{c: "TIMESTAMP" if c in TIMESTAMP_COLUMNS else "VARCHAR" for c in RAW_COLUMNS},
+}
+
+# Timestamp formats seen in the CSV export
+CSV_TIMESTAMP_FORMATS = ["%m/%d/%Y %I:%M:%S %p", "%Y-%m-%dT%H:%M:%S.%f"]
+
+
+@cache
+def transform_columns() -> list[str]:
+    """Raw columns referenced by transform.sql, in RAW_COLUMNS order."""
+    sql = re.sub(r"--.*", "", TRANSFORM_SQL_PATH.read_text())
+    identifiers = set(re.findall(r"\b[a-z_][a-z0-9_]*\b", sql.lower()))
+    return [c for c in RAW_COLUMNS if c in identifiers]
@@ -0,0 +1,184 @@
+"""
+Benchmark attaching a snapshot's .duckdb database against importing its
+Parquet file, up to the first query.
+
+Builds both artifacts the way process_jobs does (write_database) from a
+processed Parquet file (or synthetic data), then for each load path times
+the load (CREATE TABLE ... FROM parquet vs ATTACH ... READ_ONLY) and the
+first page of the jobs view (count plus 25 rows by posted_date, as
+db.ts queryJobs runs it) in a fresh database. With --http, files are
+served from a local HTTP server that supports range requests (needs the
+httpfs extension), and bytes transferred are reported too.
+
+Usage:
+    uv run scripts/bench_database.py [processed.parquet] [--http] [--runs N]
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "functions"))
+
+from process import PARQUET_FORMAT, write_database  # noqa: E402
+
+FIRST_QUERIES = [
+    "SELECT COUNT(*) AS count FROM jobs",
+    "SELECT * FROM jobs ORDER BY posted_date DESC LIMIT 25 OFFSET 0",
+]
+
+
+class RangeHandler(SimpleHTTPRequestHandler):
+    """Static file handler with single-range GET support and a byte count."""
+
+    bytes_sent = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        path = Path(self.translate_path(self.path))
+        if not header or not path.is_file():
+            return super().do_GET()
+        size = path.stat().st_size
+        start, _, end = header.removeprefix("bytes=").partition("-")
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            self.wfile.write(f.read(end - start + 1))
+        RangeHandler.bytes_sent += end - start + 1
+
+
+def make_processed(path: Path, rows: int) -> None:
+    """Write synthetic processed data with the columns the queries use."""
+    duckdb.execute(
+        f"""
+        COPY (
+            SELECT
+                md5(i::varchar) AS id,
+                (100000 + i)::varchar AS job_id,
+                'Agency ' || (i % 80) AS agency,
+                ['External', 'Internal'][1 + i % 2] AS posting_type,
+                'Title ' || (i % 1500) AS business_title,
+                50000 + i % 90000 AS salary_range_from,
+                repeat('description ', 300) AS job_description,
+                repeat('qualifications ', 60) AS minimum_qual_requirements,
+                DATE '2025-01-01' + (i % 365)::int AS posted_date
+            FROM range({rows}) t(i)
+        ) TO '{path}' ({PARQUET_FORMAT})
+        """
+    )
+
+
+def make_fts_postings(processed: Path, path: Path) -> tuple[int, float]:
+    """Approximate FTS postings (unstemmed title words) for write_database."""
+    duckdb.execute(
+        f"""
+        COPY (
+            SELECT term, id, count(*)::INTEGER AS tf, any_value(len)::INTEGER AS len
+            FROM (
+                SELECT id, unnest(string_split(lower(business_title), ' ')) AS term,
+                    len(string_split(business_title, ' ')) AS len
+                FROM '{processed}'
+            )
+            GROUP BY ALL
+            ORDER BY term, id
+        ) TO '{path}' ({PARQUET_FORMAT})
+        """
+    )
+    return duckdb.execute(
+        f"SELECT count(DISTINCT id), avg(len) FROM '{path}'"
+    ).fetchone()
+
+
+def run(load: str, first_queries: list[str]) -> tuple[float, float]:
+    """Load into a fresh database, then run the first queries; return times."""
+    conn = duckdb.connect()
+    start = time.perf_counter()
+    conn.execute(load)
+    loaded = time.perf_counter()
+    for query in first_queries:
+        conn.execute(query).fetchall()
+    done = time.perf_counter()
+    conn.close()
+    return loaded - start, done - loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("processed", nargs="?", type=Path)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--http", action="store_true")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        processed = tmp / "jobs.parquet"
+        if args.processed:
+            processed.write_bytes(args.processed.read_bytes())
+        else:
+            make_processed(processed, args.rows)
+        fts_stats = make_fts_postings(processed, tmp / "fts.parquet")
+        write_database(
+            duckdb.connect(),
+            processed,
+            tmp / "fts.parquet",
+            fts_stats,
+            tmp / "snapshot.duckdb",
+        )
+
+        base = str(tmp)
+        if args.http:
+            handler = partial(RangeHandler, directory=str(tmp))
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base = f"http://127.0.0.1:{server.server_port}"
+
+        loads = {
+            "parquet import": (
+                f"CREATE TABLE jobs AS SELECT * FROM '{base}/jobs.parquet'"
+            ),
+            "database attach": (
+                f"ATTACH '{base}/snapshot.duckdb' AS snapshot (READ_ONLY); USE snapshot"
+            ),
+        }
+        print(
+            f"parquet {processed.stat().st_size:,} bytes, "
+            f"database {(tmp / 'snapshot.duckdb').stat().st_size:,} bytes"
+        )
+        header = "path              load   first query    total"
+        print(header + "   bytes read" * args.http)
+        for name, load in loads.items():
+            RangeHandler.bytes_sent = 0
+            times = [run(load, FIRST_QUERIES) for _ in range(args.runs)]
+            load_s = statistics.median(t[0] for t in times)
+            query_s = statistics.median(t[1] for t in times)
+            line = (
+                f"{name:<15} {load_s:>6.3f}s  {query_s:>10.3f}s"
+                f"  {load_s + query_s:>6.3f}s"
+            )
+            if args.http:
+                line += f"  {RangeHandler.bytes_sent // args.runs:>11,}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
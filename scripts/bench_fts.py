@@ -0,0 +1,312 @@
+"""
+Benchmark the web client's time to first search with and without the
+pipeline-built FTS index.
+
+Replays db.ts after the jobs table is loaded, in native DuckDB on local
+files (a browser runs the same SQL in WASM, several times slower):
+- browser index (old): PRAGMA create_fts_index over the jobs table, then
+  searches scored by fts_main_jobs.match_bm25
+- pipeline index: load fts/<snapshot>.parquet (written by write_fts_index)
+  into fts_postings, then searches scored by ftsScoresSql
+A search is queryJobs' relevance-ordered count and first page. Reports the
+index setup, the first search, the median of the other searches and their
+sum (time to first search), each the median over --runs fresh databases,
+plus the size of the postings file the client downloads.
+
+Without the fts extension (offline, say), both indexes are emulated in
+plain SQL: the tables and match_bm25 macro create_fts_index builds, with
+the same tokenizer but no stemming or stopwords. The output says so.
+
+Usage:
+    uv run scripts/bench_fts.py [processed.parquet] [--rows N] [--runs N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "functions"))
+
+from process import (  # noqa: E402
+    CLIENT_FTS_SCORES_SQL,
+    FTS_COLUMNS,
+    FTS_OPTIONS,
+    PARQUET_FORMAT,
+    write_fts_index,
+)
+
+TOKENIZE = (
+    "string_split_regex(regexp_replace(lower(strip_accents(s::VARCHAR)), "
+    "'(\\.|[^a-z])+', ' ', 'g'), '\\s+')"
+)
+
+# What create_fts_index builds for FTS_OPTIONS, without stemming or stopwords
+EMULATED_INDEX_SQL = f"""
+CREATE SCHEMA fts_main_jobs;
+CREATE MACRO fts_main_jobs.tokenize(s) AS {TOKENIZE};
+CREATE TABLE fts_main_jobs.docs AS
+SELECT row_number() OVER () AS docid, id AS name FROM jobs;
+CREATE TABLE fts_main_jobs.words AS
+SELECT term, docid FROM (
+    SELECT unnest(fts_main_jobs.tokenize(concat_ws(' ', {", ".join(FTS_COLUMNS)})))
+        AS term, docid
+    FROM jobs JOIN fts_main_jobs.docs ON name = id
+)
+WHERE term != '';
+CREATE TABLE fts_main_jobs.dict AS
+SELECT row_number() OVER () AS termid, term, df FROM (
+    SELECT term, count(DISTINCT docid) AS df FROM fts_main_jobs.words GROUP BY term
+);
+CREATE TABLE fts_main_jobs.terms AS
+SELECT termid, docid FROM fts_main_jobs.words JOIN fts_main_jobs.dict USING (term);
+DROP TABLE fts_main_jobs.words;
+CREATE OR REPLACE TABLE fts_main_jobs.docs AS
+SELECT docid, name, count(termid) AS len
+FROM fts_main_jobs.docs LEFT JOIN fts_main_jobs.terms USING (docid)
+GROUP BY ALL;
+CREATE TABLE fts_main_jobs.stats AS
+SELECT count(*) AS num_docs, avg(len) AS avgdl FROM fts_main_jobs.docs;
+CREATE MACRO fts_main_jobs.match_bm25(docname, query_string, k := 1.2, b := 0.75) AS (
+    WITH tokens AS (
+        SELECT DISTINCT unnest(fts_main_jobs.tokenize(query_string)) AS term
+    ),
+    term_tf AS (
+        SELECT termid, docid, count(*) AS tf
+        FROM fts_main_jobs.terms
+        WHERE termid IN (SELECT termid FROM fts_main_jobs.dict JOIN tokens USING (term))
+        GROUP BY ALL
+    ),
+    scores AS (
+        SELECT docid, sum(
+            log(((SELECT num_docs FROM fts_main_jobs.stats) - df + 0.5) / (df + 0.5))
+            * (tf * (k + 1) / (tf + k * (1 - b + b * len
+                / (SELECT avgdl FROM fts_main_jobs.stats))))
+        ) AS score
+        FROM term_tf
+        JOIN fts_main_jobs.docs USING (docid)
+        JOIN fts_main_jobs.dict USING (termid)
+        GROUP BY docid
+    )
+    SELECT score FROM scores JOIN fts_main_jobs.docs USING (docid)
+    WHERE name = docname
+);
+"""
+
+
+def make_processed(conn: duckdb.DuckDBPyConnection, rows: int) -> None:
+    """
+    Synthetic jobs with FTS_COLUMNS, words drawn from a skewed vocabulary.
+
+    Words are letters only (the tokenizer splits on anything else), and
+    descriptions run to a few hundred words, like real postings.
+    """
+    conn.execute(
+        """
+        CREATE TABLE vocabulary AS
+        SELECT list(
+            chr(97 + n % 26) || chr(97 + n // 26 % 26) || chr(97 + n // 676 % 26)
+            || chr(97 + n // 17576 % 26)
+        ) AS pool
+        FROM (SELECT range::int AS n FROM range(8000))
+        """
+    )
+    word = "pool[1 + floor(8000 * pow(random(), 3))::int]"
+    text = "array_to_string(list_transform(range({}), x -> " + word + "), ' ')"
+    conn.execute(
+        f"""
+        CREATE TABLE jobs AS
+        SELECT
+            md5(i::varchar) AS id,
+            {text.format(3)} AS business_title,
+            {text.format(300)} AS job_description,
+            'Department of ' || {word} AS agency,
+            {text.format(2)} AS civil_service_title,
+            DATE '2024-01-01' + floor(random() * 730)::int AS posted_date
+        FROM range({rows}) t(i), vocabulary
+        """
+    )
+    conn.execute("DROP TABLE vocabulary")
+
+
+def write_emulated_postings(
+    conn: duckdb.DuckDBPyConnection, processed_file: Path, output: Path
+) -> None:
+    """write_fts_index over the emulated index."""
+    conn.execute(f"CREATE TABLE jobs AS FROM '{processed_file}'")
+    conn.execute(EMULATED_INDEX_SQL)
+    num_docs, avgdl = conn.execute(
+        "SELECT num_docs, avgdl FROM fts_main_jobs.stats"
+    ).fetchone()
+    conn.execute(
+        f"""
+        COPY (
+            SELECT dict.term, docs.name AS id, count(*)::INTEGER AS tf,
+                docs.len::INTEGER AS len
+            FROM fts_main_jobs.terms AS terms
+            JOIN fts_main_jobs.dict AS dict USING (termid)
+            JOIN fts_main_jobs.docs AS docs USING (docid)
+            GROUP BY ALL
+            ORDER BY dict.term, id
+        ) TO '{output}' (
+            {PARQUET_FORMAT},
+            KV_METADATA {{num_docs: '{num_docs}', avgdl: '{avgdl}'}}
+        )
+        """
+    )
+
+
+def search_queries(scored_jobs: str) -> list[str]:
+    """queryJobs' count and first page over a scored_jobs subquery."""
+    base = f"({scored_jobs}) AS scored_jobs WHERE fts_score IS NOT NULL"
+    return [
+        f"SELECT COUNT(*) AS count FROM {base}",
+        f"SELECT * FROM {base} ORDER BY fts_score DESC LIMIT 25 OFFSET 0",
+    ]
+
+
+def browser_index(conn: duckdb.DuckDBPyConnection, emulated: bool) -> str:
+    """Index the jobs table (createFtsIndex); returns the scored_jobs SQL."""
+    if emulated:
+        conn.execute(EMULATED_INDEX_SQL)
+    else:
+        conn.execute("LOAD fts")
+        fields = ", ".join(f"'{column}'" for column in FTS_COLUMNS)
+        conn.execute(f"PRAGMA create_fts_index('jobs', 'id', {fields}, {FTS_OPTIONS})")
+    return (
+        "SELECT jobs.*, fts_main_jobs.match_bm25(jobs.id, '{search}') AS fts_score "
+        "FROM jobs"
+    )
+
+
+def pipeline_index(
+    conn: duckdb.DuckDBPyConnection, postings: Path, emulated: bool
+) -> str:
+    """Load the postings (attachFtsIndex); returns the scored_jobs SQL."""
+    scores_sql = CLIENT_FTS_SCORES_SQL
+    if emulated:
+        scores_sql = scores_sql.replace("stem(unnest(", "(unnest(").replace(
+            ")), 'english') AS term", "))) AS term"
+        )
+    else:
+        conn.execute("LOAD fts")
+    conn.execute(
+        "CREATE TABLE fts_postings AS SELECT *, "
+        f"count(*) OVER (PARTITION BY term) AS df FROM '{postings}'"
+    )
+    kv = dict(
+        conn.execute(
+            "SELECT key::VARCHAR, value::VARCHAR "
+            f"FROM parquet_kv_metadata('{postings}')"
+        ).fetchall()
+    )
+    scores_sql = scores_sql.format(
+        search="{search}", num_docs=kv["num_docs"], avgdl=kv["avgdl"]
+    )
+    return (
+        "SELECT jobs.*, scores.fts_score "
+        f"FROM jobs JOIN ({scores_sql}) AS scores USING (id)"
+    )
+
+
+def pick_searches(postings: Path) -> list[str]:
+    """A common, a middling and a rare term, and two multi-term searches."""
+    terms = [
+        term
+        for (term,) in duckdb.sql(
+            f"SELECT term FROM '{postings}' GROUP BY term "
+            "HAVING length(term) > 2 ORDER BY count(*) DESC, term"
+        ).fetchall()
+    ]
+    common, middling, rare = terms[0], terms[len(terms) // 2], terms[-1]
+    return [
+        common,
+        middling,
+        rare,
+        f"{middling} {rare}",
+        f"{terms[1]} {terms[len(terms) // 4]} {terms[len(terms) // 3]}",
+    ]
+
+
+def run(processed: Path, setup, searches: list[str]) -> tuple[float, float, float]:
+    """(setup s, first search s, median later search s) in a fresh database."""
+    with duckdb.connect() as conn:
+        conn.execute(f"CREATE TABLE jobs AS FROM '{processed}'")
+        start = time.perf_counter()
+        scored_jobs = setup(conn)
+        setup_s = time.perf_counter() - start
+
+        times = []
+        for search in searches:
+            start = time.perf_counter()
+            for sql in search_queries(scored_jobs.format(search=search)):
+                conn.execute(sql).fetchall()
+            times.append(time.perf_counter() - start)
+    return setup_s, times[0], statistics.median(times[1:])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("processed", nargs="?", type=Path)
+    parser.add_argument("--rows", type=int, default=6000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        duckdb.execute("INSTALL fts")
+        emulated = False
+    except duckdb.Error as e:
+        print(f"fts extension unavailable ({e.__class__.__name__}); emulating it\n")
+        emulated = True
+
+    with TemporaryDirectory() as tmpdir:
+        processed = args.processed
+        if processed is None:
+            processed = Path(tmpdir) / "processed.parquet"
+            with duckdb.connect() as conn:
+                make_processed(conn, args.rows)
+                conn.execute(f"COPY jobs TO '{processed}' ({PARQUET_FORMAT})")
+
+        postings = Path(tmpdir) / "fts.parquet"
+        start = time.perf_counter()
+        with duckdb.connect() as conn:
+            if emulated:
+                write_emulated_postings(conn, processed, postings)
+            else:
+                conn.execute("LOAD fts")
+                write_fts_index(conn, processed, postings)
+        build_s = time.perf_counter() - start
+        searches = pick_searches(postings)
+
+        paths = {
+            "browser index (old)": lambda conn: browser_index(conn, emulated),
+            "pipeline index": lambda conn: pipeline_index(conn, postings, emulated),
+        }
+        results = {}
+        for name, setup in paths.items():
+            runs = [run(processed, setup, searches) for _ in range(args.runs)]
+            results[name] = [statistics.median(column) for column in zip(*runs)]
+
+        rows = duckdb.sql(f"SELECT count(*) FROM '{processed}'").fetchone()[0]
+        print(
+            f"{rows} jobs{' (emulated fts)' if emulated else ''}; "
+            f"postings {postings.stat().st_size / 1024:.0f} KB, "
+            f"built in {build_s:.2f}s by the pipeline; searches {searches}"
+        )
+        print(
+            f"{'':<22}{'setup s':>9}{'first ms':>10}{'later ms':>10}"
+            f"{'to search s':>13}"
+        )
+        for name, (setup_s, first_s, later_s) in results.items():
+            print(
+                f"{name:<22}{setup_s:>9.2f}{first_s * 1000:>10.1f}"
+                f"{later_s * 1000:>10.1f}{setup_s + first_s:>13.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
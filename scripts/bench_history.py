@@ -0,0 +1,111 @@
+"""
+Benchmark jobs_history update time and size against the number of snapshots.
+
+Compares rebuilding the interval history from every processed snapshot with
+applying only the newest snapshot to the open versions, and reports how many
+rows the interval history stores versus one row per posting per snapshot.
+Runs on local files, so GCS transfer time is not included.
+
+Usage:
+    uv run scripts/bench_history.py [max_snapshots] [rows_per_snapshot]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "functions"))
+
+from process import (  # noqa: E402
+    PARQUET_FORMAT,
+    apply_snapshot_sql,
+    history_intervals_sql,
+)
+
+
+def make_snapshots(out_dir: Path, count: int, rows: int) -> list[str]:
+    """
+    Write `count` synthetic daily snapshots of `rows` rows each.
+
+    About 1% of postings are replaced and 1% have a different salary each
+    day, so most rows repeat from one snapshot to the next as they do in the
+    real dataset. id hashes the whole row, as in transform.sql.
+    """
+    conn = duckdb.connect()
+    paths = []
+    for day in range(count):
+        snapshot = datetime(2020, 1, 1) + timedelta(days=day)
+        path = out_dir / f"{snapshot.isoformat()}+00:00.parquet"
+        conn.execute(
+            f"""
+            COPY (
+                SELECT md5(snapshot::varchar) AS id, snapshot.*
+                FROM (
+                    SELECT
+                        k::varchar AS job_id,
+                        'Agency ' || (k % 80) AS agency,
+                        'Title ' || (k % 1500) AS business_title,
+                        50000 + k % 90000 + (hash(k, {day}) % 100 = 0)::int * {day}
+                            AS salary_range_from,
+                        repeat('description ', 40) AS job_description,
+                        repeat('qualifications ', 20) AS minimum_qual_requirements,
+                        'Residency' AS residency_requirement,
+                        DATE '{snapshot.date()}' AS processed_date
+                    FROM (SELECT i + {day} * {rows // 100} AS k FROM range({rows}) t(i))
+                ) AS snapshot
+            ) TO '{path}' ({PARQUET_FORMAT})
+            """
+        )
+        paths.append(str(path))
+    return paths
+
+
+def timed(conn: duckdb.DuckDBPyConnection, query: str, output: Path) -> float:
+    start = time.perf_counter()
+    conn.execute(f"COPY ({query}) TO '{output}' ({PARQUET_FORMAT})")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    max_snapshots = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    counts = [n for n in (2, 10, 100, 1000) if n <= max_snapshots]
+
+    with TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        print(f"Writing {max(counts)} snapshots of {rows} rows...")
+        snapshots = make_snapshots(tmp, max(counts), rows)
+        conn = duckdb.connect()
+
+        print("snapshots  full rebuild  incremental   daily rows  intervals")
+        for n in counts:
+            full = tmp / "full.parquet"
+            rebuild_s = timed(conn, history_intervals_sql(snapshots[:n]), full)
+            intervals = conn.execute(f"SELECT count(*) FROM '{full}'").fetchone()[0]
+
+            # Open versions as of the previous snapshot (not timed)
+            open_path = tmp / "open.parquet"
+            conn.execute(
+                f"COPY (SELECT * FROM ({history_intervals_sql(snapshots[: n - 1])}) "
+                f"WHERE valid_to IS NULL) TO '{open_path}' ({PARQUET_FORMAT})"
+            )
+            start = time.perf_counter()
+            closed, still_open = apply_snapshot_sql(
+                conn, str(open_path), snapshots[n - 1]
+            )
+            timed(conn, closed, tmp / "closed.parquet")
+            timed(conn, still_open, tmp / "new_open.parquet")
+            incremental_s = time.perf_counter() - start
+
+            print(
+                f"{n:>9}  {rebuild_s:>11.2f}s  {incremental_s:>10.2f}s"
+                f"  {n * rows:>11}  {intervals:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
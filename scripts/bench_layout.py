@@ -0,0 +1,340 @@
+"""
+Benchmark candidate Parquet layouts for processed snapshots.
+
+Writes the same rows with each candidate layout (sort order, row group
+size, bloom filters, ZSTD level) and replays the query shapes of db.ts
+(queryJobs pages and counts, getJob, filter option lists) against each,
+reporting file size, latency and bytes read.
+
+Bytes read are measured: the bytes DuckDB reads from the file during one
+run of each query (the process's rchar in /proc/self/io, so Linux only).
+Next to them is an estimate of what a range-reading client (DuckDB WASM
+over HTTP) would fetch, from the file's metadata: the footer plus the
+column chunks of every row group that min/max stats and bloom filters
+can't rule out. Ordered pages stop early when the file is sorted by
+posted_date, otherwise they read the sort and filter columns of every
+candidate row group plus the row groups holding the page's rows.
+
+Usage:
+    uv run scripts/bench_layout.py [processed.parquet] [--rows N] [--runs N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "functions"))
+
+from process import PARQUET_FORMAT, PROCESSED_FORMAT, PROCESSED_ORDER  # noqa: E402
+
+PAGE = 25
+
+# DuckDB doesn't write row groups smaller than its 2048-row vector size
+GROUPS_2K = f"{PARQUET_FORMAT}, ROW_GROUP_SIZE 2048"
+
+CANDIDATES = {
+    "unsorted (old)": ("", PARQUET_FORMAT),
+    "sorted": (PROCESSED_ORDER, PARQUET_FORMAT),
+    "sorted, 8k groups": (PROCESSED_ORDER, f"{PARQUET_FORMAT}, ROW_GROUP_SIZE 8192"),
+    "sorted, 4k groups": (PROCESSED_ORDER, f"{PARQUET_FORMAT}, ROW_GROUP_SIZE 4096"),
+    "sorted, 2k groups": (PROCESSED_ORDER, GROUPS_2K),
+    # Bloom filters are only written for dictionary-encoded chunks
+    "sorted, 2k, no bloom": (PROCESSED_ORDER, f"{GROUPS_2K}, DICTIONARY_SIZE_LIMIT 1"),
+    "sorted, 2k, zstd 9": (PROCESSED_ORDER, f"{GROUPS_2K}, COMPRESSION_LEVEL 9"),
+    "sorted, 2k, zstd 12": (PROCESSED_ORDER, f"{GROUPS_2K}, COMPRESSION_LEVEL 12"),
+    "sorted, 2k, zstd 15": (PROCESSED_ORDER, f"{GROUPS_2K}, COMPRESSION_LEVEL 15"),
+    "current (process.py)": (PROCESSED_ORDER, PROCESSED_FORMAT),
+}
+
+
+@dataclass
+class Shape:
+    """A db.ts query shape and what a range reader needs for it."""
+
+    sql: str
+    where: str = "true"
+    # column -> (min, max) the matching rows fall in, for min/max pruning
+    ranges: dict[str, tuple[str, str]] = field(default_factory=dict)
+    lookup: tuple[str, str] | None = None  # (column, value) for bloom filters
+    columns: list[str] | None = None  # columns read (None = all)
+    page: bool = False  # ORDER BY posted_date DESC LIMIT PAGE
+
+
+def shapes(conn: duckdb.DuckDBPyConnection) -> dict[str, Shape]:
+    """Query shapes from db.ts, with literals picked from the data."""
+    agency, job_id, id_ = conn.execute(
+        "SELECT mode(agency), median(job_id), (SELECT id FROM jobs LIMIT 1 OFFSET "
+        "(SELECT count(*) // 2 FROM jobs)) FROM jobs"
+    ).fetchone()
+    since = conn.execute("SELECT max(posted_date) - 30 FROM jobs").fetchone()[0]
+    agency_where = f"agency IN ('{agency}')"
+    recent_where = f"posted_date >= '{since}' AND posting_type IN ('External')"
+    salary_where = "salary_range_to >= 80000 AND salary_range_from <= 90000"
+    return {
+        "default page": Shape(
+            "SELECT * FROM jobs ORDER BY posted_date DESC LIMIT 25", page=True
+        ),
+        "default count": Shape("SELECT COUNT(*) FROM jobs", columns=[]),
+        "agency page": Shape(
+            f"SELECT * FROM jobs WHERE {agency_where} "
+            "ORDER BY posted_date DESC LIMIT 25",
+            where=agency_where,
+            ranges={"agency": (agency, agency)},
+            page=True,
+        ),
+        "agency count": Shape(
+            f"SELECT COUNT(*) FROM jobs WHERE {agency_where}",
+            ranges={"agency": (agency, agency)},
+            columns=["agency"],
+        ),
+        "last 30 days, external": Shape(
+            f"SELECT * FROM jobs WHERE {recent_where} "
+            "ORDER BY posted_date DESC LIMIT 25",
+            where=recent_where,
+            ranges={
+                "posted_date": (str(since), "9999-12-31"),
+                "posting_type": ("External", "External"),
+            },
+            page=True,
+        ),
+        "salary count": Shape(
+            f"SELECT COUNT(*) FROM jobs WHERE {salary_where}",
+            columns=["salary_range_from", "salary_range_to"],
+        ),
+        "getJob by id": Shape(
+            f"SELECT * FROM jobs WHERE id = '{id_}'",
+            ranges={"id": (id_, id_)},
+            lookup=("id", id_),
+        ),
+        "job_id lookup": Shape(
+            f"SELECT * FROM jobs WHERE job_id = '{job_id}'",
+            ranges={"job_id": (job_id, job_id)},
+            lookup=("job_id", job_id),
+        ),
+        "agency list": Shape(
+            "SELECT DISTINCT agency FROM jobs ORDER BY agency", columns=["agency"]
+        ),
+    }
+
+
+def make_processed(conn: duckdb.DuckDBPyConnection, rows: int) -> None:
+    """
+    Synthetic processed rows in arrival order, with skewed agencies.
+
+    Descriptions are drawn from a pool of shared sentences, like the
+    boilerplate real postings repeat, so compression levels compare fairly.
+    """
+    conn.execute(
+        """
+        CREATE TABLE sentences AS
+        SELECT list(array_to_string(
+            list_transform(range(14), x -> 'word' || floor(3000 * pow(random(), 2))),
+            ' '
+        )) AS pool
+        FROM range(600)
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE jobs AS
+        SELECT
+            md5(i::varchar) AS id,
+            (400000 + i * 7 % {rows * 3})::varchar AS job_id,
+            'Agency ' || floor(80 * pow(random(), 3))::int AS agency,
+            ['External', 'Internal'][1 + (random() < 0.4)::int] AS posting_type,
+            'Title ' || (i % 1500) AS business_title,
+            50000 + floor(random() * 90000) AS salary_range_from,
+            100000 + floor(random() * 90000) AS salary_range_to,
+            array_to_string(
+                list_transform(range(20), x -> pool[1 + floor(600 * random())::int]),
+                '. '
+            ) AS job_description,
+            array_to_string(
+                list_transform(range(4), x -> pool[1 + floor(600 * random())::int]),
+                '. '
+            ) AS minimum_qual_requirements,
+            'Residency ' || (i % 3) AS residency_requirement,
+            DATE '2024-01-01' + floor(random() * 730)::int AS posted_date
+        FROM range({rows}) t(i), sentences
+        """
+    )
+    conn.execute("DROP TABLE sentences")
+
+
+def bytes_read() -> int:
+    """Bytes this process has read through read syscalls so far."""
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("rchar:"):
+                return int(line.split()[1])
+    raise RuntimeError("/proc/self/io has no rchar")
+
+
+def estimate_bytes(
+    conn: duckdb.DuckDBPyConnection, path: Path, shape: Shape, sorted_by_date: bool
+) -> int:
+    """Bytes a range reader fetches for shape (see module docstring)."""
+    chunks = conn.execute(
+        f"""
+        SELECT row_group_id, row_group_num_rows, path_in_schema, total_compressed_size,
+            stats_min_value, stats_max_value,
+            coalesce(dictionary_page_offset, data_page_offset) + total_compressed_size,
+            coalesce(bloom_filter_length, 0)
+        FROM parquet_metadata('{path}')
+        ORDER BY row_group_id
+        """
+    ).fetchall()
+    groups: dict[int, dict] = {}
+    for group, num_rows, column, size, lo, hi, _, bloom in chunks:
+        info = groups.setdefault(
+            group, {"rows": num_rows, "sizes": {}, "stats": {}, "blooms": {}}
+        )
+        info["sizes"][column] = size
+        info["stats"][column] = (lo, hi)
+        info["blooms"][column] = bloom
+    # Bloom filters sit between the column chunks and the footer, and are
+    # only fetched when probed
+    data_end = max(end for *_, end, _ in chunks)
+    blooms = sum(bloom for *_, bloom in chunks)
+    footer = path.stat().st_size - data_end - blooms
+
+    def overlaps(info: dict) -> bool:
+        for column, (lo, hi) in shape.ranges.items():
+            stat_lo, stat_hi = info["stats"][column]
+            if column.startswith("salary"):
+                lo, hi, stat_lo, stat_hi = map(float, (lo, hi, stat_lo, stat_hi))
+            if stat_hi < lo or stat_lo > hi:
+                return False
+        return True
+
+    candidates = [g for g, info in groups.items() if overlaps(info)]
+    if shape.lookup:
+        column, value = shape.lookup
+        footer += sum(groups[g]["blooms"][column] for g in candidates)
+        excluded = {
+            group
+            for group, excludes in conn.execute(
+                f"SELECT row_group_id, bloom_filter_excludes "
+                f"FROM parquet_bloom_probe('{path}', '{column}', '{value}')"
+            ).fetchall()
+            if excludes
+        }
+        candidates = [g for g in candidates if g not in excluded]
+
+    def size(group: int, columns: list[str] | None) -> int:
+        sizes = groups[group]["sizes"]
+        return sum(sizes[c] for c in (sizes if columns is None else columns))
+
+    if not shape.page:
+        return footer + sum(size(g, shape.columns) for g in candidates)
+
+    # Matching rows per row group, to know where the first page ends
+    starts, total = {}, 0
+    for group in sorted(groups):
+        starts[group] = total
+        total += groups[group]["rows"]
+    matches = dict.fromkeys(groups, 0)
+    for (row,) in conn.execute(
+        f"SELECT file_row_number FROM read_parquet('{path}', file_row_number = true) "
+        f"WHERE {shape.where}"
+    ).fetchall():
+        group = max(g for g, start in starts.items() if start <= row)
+        matches[group] += 1
+
+    if sorted_by_date:
+        read, found = 0, 0
+        for group in candidates:
+            read += size(group, None)
+            found += matches[group]
+            if found >= PAGE:
+                break
+        return footer + read
+
+    filter_columns = ["posted_date", *shape.ranges]
+    page_groups = {g for g in candidates if matches[g]}
+    return (
+        footer
+        + sum(size(g, filter_columns) for g in candidates)
+        + sum(size(g, None) for g in page_groups)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("processed", nargs="?", type=Path)
+    parser.add_argument("--rows", type=int, default=6000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = duckdb.connect()
+    if args.processed:
+        conn.execute(f"CREATE TABLE jobs AS SELECT * FROM '{args.processed}'")
+    else:
+        make_processed(conn, args.rows)
+    query_shapes = shapes(conn)
+
+    with TemporaryDirectory() as tmpdir:
+        results = {}
+        for name, (order, fmt) in CANDIDATES.items():
+            path = Path(tmpdir) / f"{len(results)}.parquet"
+            order_by = f"ORDER BY {order}" if order else ""
+            start = time.perf_counter()
+            conn.execute(f"COPY (SELECT * FROM jobs {order_by}) TO '{path}' ({fmt})")
+            write_s = time.perf_counter() - start
+
+            per_shape = {}
+            for shape_name, shape in query_shapes.items():
+                # Uncached, so every run reads the footer like a new client
+                view = duckdb.connect(config={"enable_external_file_cache": False})
+                view.execute(f"CREATE VIEW jobs AS SELECT * FROM '{path}'")
+                before = bytes_read()
+                view.execute(shape.sql).fetchall()
+                read = bytes_read() - before
+                times = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    view.execute(shape.sql).fetchall()
+                    times.append(time.perf_counter() - start)
+                view.close()
+                per_shape[shape_name] = (
+                    read,
+                    estimate_bytes(conn, path, shape, order.startswith("posted_date")),
+                    statistics.median(times),
+                )
+            results[name] = (path.stat().st_size, write_s, per_shape)
+
+        print(
+            f"{'layout':<28}{'file KB':>9}{'write s':>9}{'read KB':>9}{'est KB':>9}"
+            f"{'query ms':>10}"
+        )
+        for name, (size, write_s, per_shape) in results.items():
+            read_kb = sum(read for read, _, _ in per_shape.values()) / 1024
+            est_kb = sum(est for _, est, _ in per_shape.values()) / 1024
+            ms = sum(t for _, _, t in per_shape.values()) * 1000
+            print(
+                f"{name:<28}{size / 1024:>9.0f}{write_s:>9.2f}{read_kb:>9.0f}"
+                f"{est_kb:>9.0f}{ms:>10.1f}"
+            )
+
+        print("\nread KB (estimated KB) per query shape")
+        print(f"{'shape':<24}" + "".join(f"{n[:14]:>16}" for n in results))
+        for shape_name in query_shapes:
+            print(
+                f"{shape_name:<24}"
+                + "".join(
+                    f"{per_shape[shape_name][0] / 1024:>9.0f} ({per_shape[shape_name][1] / 1024:.0f})".rjust(
+                        16
+                    )
+                    for _, _, per_shape in results.values()
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
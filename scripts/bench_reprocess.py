@@ -0,0 +1,105 @@
+"""
+Benchmark reprocess_all's worker pool against the number of cores.
+
+Writes synthetic raw NDJSON snapshots, then processes them all with
+process.run_parallel for 1 to N cores, once with a single worker (DuckDB
+parallelism only) and once with one worker per core. Runs on local files, so
+the GCS download and upload time that workers also overlap is not included.
+
+Usage:
+    uv run scripts/bench_reprocess.py [snapshots] [rows_per_snapshot] [max_cores]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import duckdb
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "functions"))
+
+from process import PARQUET_FORMAT, raw_table_sql, run_parallel  # noqa: E402
+from schema import TRANSFORM_SQL_PATH, transform_columns  # noqa: E402
+
+
+def make_raw_snapshots(out_dir: Path, count: int, rows: int) -> list[Path]:
+    """Write `count` synthetic raw snapshots of `rows` rows each."""
+    values = {
+        "job_category": "'Health Legal Affairs'",
+        "salary_range_from": "(50000 + i % 90000)::varchar",
+        "salary_range_to": "(60000 + i % 90000)::varchar",
+        "posting_date": "'2026-01-01T00:00:00.000'",
+        "posting_updated": "'2026-01-02T00:00:00.000'",
+        "process_date": "'2026-01-03T00:00:00.000'",
+        "post_until": "'12-JAN-2026'",
+        "job_description": "repeat('description ', 200)",
+    }
+    select = ", ".join(
+        f"{values.get(name, repr(name + ' ') + ' || (i % 1000)')} AS {name}"
+        for name in transform_columns()
+    )
+    conn = duckdb.connect()
+    paths = []
+    for n in range(count):
+        path = out_dir / f"{n:04d}.ndjson"
+        conn.execute(
+            f"""
+            COPY (SELECT 'row-' || i AS ":id", {select} FROM range({rows}) t(i))
+            TO '{path}' (FORMAT JSON)
+            """
+        )
+        paths.append(path)
+    return paths
+
+
+def reprocess(
+    raw_paths: list[Path], out_dir: Path, threads: int, workers: int
+) -> float:
+    """Process every raw file like process_jobs, returning seconds taken."""
+    transform_sql = TRANSFORM_SQL_PATH.read_text()
+    database = duckdb.connect(config={"threads": threads})
+
+    def task(raw_path: Path) -> None:
+        conn = database.cursor()
+        try:
+            conn.execute(raw_table_sql(str(raw_path)))
+            output = out_dir / f"{raw_path.stem}.parquet"
+            conn.execute(f"COPY ({transform_sql}) TO '{output}' ({PARQUET_FORMAT})")
+        finally:
+            conn.close()
+
+    start = time.perf_counter()
+    for _ in run_parallel(task, raw_paths, workers):
+        pass
+    elapsed = time.perf_counter() - start
+    database.close()
+    return elapsed
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    max_cores = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+    cores = [c for c in (1, 2, 4, 8, 16, 32, 64) if c < max_cores] + [max_cores]
+
+    with TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        print(f"Writing {count} raw snapshots of {rows} rows...")
+        raw_paths = make_raw_snapshots(tmp, count, rows)
+
+        baseline = None
+        print("cores  1 worker  1/core   speedup")
+        for c in cores:
+            single_s = reprocess(raw_paths, tmp, threads=c, workers=1)
+            pooled_s = reprocess(raw_paths, tmp, threads=c, workers=c)
+            baseline = baseline or single_s
+            print(
+                f"{c:>5}  {single_s:>7.2f}s  {pooled_s:>6.2f}s"
+                f"  {baseline / pooled_s:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/bin/bash
+#
+# Download the DuckDB extensions process.py loads into functions/duckdb_extensions,
+# laid out as an extension_directory for the Cloud Function's platform, so the
+# deployed function loads them offline instead of running INSTALL on cold start.
+#
+# Usage:
+#   ./scripts/bundle-duckdb-extensions.sh
+#
+set -e
+
+FUNCTIONS_DIR="$(dirname "$0")/../functions"
+# Must match the duckdb pinned in requirements.txt and EXTENSIONS in process.py
+VERSION="v$(sed -n 's/^duckdb==//p' "$FUNCTIONS_DIR/requirements.txt")"
+PLATFORM="${DUCKDB_PLATFORM:-linux_amd64}"
+EXTENSIONS="httpfs fts"
+EXTENSION_DIR="$FUNCTIONS_DIR/duckdb_extensions"
+
+[ "$VERSION" = "v" ] && echo "duckdb is not pinned in requirements.txt" && exit 1
+
+# Drop bundles for other DuckDB versions
+mkdir -p "$EXTENSION_DIR/$VERSION/$PLATFORM"
+find "$EXTENSION_DIR" -mindepth 1 -maxdepth 1 ! -name "$VERSION" -exec rm -rf {} +
+
+for EXT in $EXTENSIONS; do
+  FILE="$EXTENSION_DIR/$VERSION/$PLATFORM/$EXT.duckdb_extension"
+  [ -f "$FILE" ] && continue
+  echo "Downloading $EXT $VERSION ($PLATFORM)..."
+  curl -fsSL "https://extensions.duckdb.org/$VERSION/$PLATFORM/$EXT.duckdb_extension.gz" \
+    | gunzip > "$FILE.tmp"
+  mv "$FILE.tmp" "$FILE"
+done
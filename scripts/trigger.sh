@@ -4,7 +4,8 @@
 #
 # Usage:
 #   ./scripts/trigger.sh              # Normal: fetch new data + process
-#   ./scripts/trigger.sh reprocess    # Reprocess all raw snapshots
+#   ./scripts/trigger.sh reprocess    # Reprocess out-of-date raw snapshots
+#   ./scripts/trigger.sh reprocess force  # Reprocess all raw snapshots
 #   ./scripts/trigger.sh logs         # View recent logs
 #
 
@@ -27,15 +28,21 @@ case "${1:-latest}" in
     ;;
 
   reprocess)
-    echo "Triggering $FUNCTION_NAME (action=reprocess_all)..."
-    echo "This will delete all processed files and reprocess all raw snapshots."
+    FORCE=false
+    [ "${2:-}" = "force" ] && FORCE=true
+    echo "Triggering $FUNCTION_NAME (action=reprocess_all, force=$FORCE)..."
+    if [ "$FORCE" = true ]; then
+      echo "This will reprocess all raw snapshots."
+    else
+      echo "This will reprocess raw snapshots whose processed file is out of date."
+    fi
     read -p "Continue? [y/N] " -n 1 -r
     echo
     if [[ $REPLY =~ ^[Yy]$ ]]; then
       gcloud functions call $FUNCTION_NAME \
         --region $REGION \
         --project $PROJECT \
-        --data '{"action": "reprocess_all"}'
+        --data "{\"action\": \"reprocess_all\", \"force\": $FORCE}"
     else
       echo "Aborted."
       exit 1
@@ -51,11 +58,12 @@ case "${1:-latest}" in
     ;;
 
   *)
-    echo "Usage: $0 [latest|reprocess|logs]"
+    echo "Usage: $0 [latest|reprocess [force]|logs]"
     echo ""
     echo "Commands:"
     echo "  latest     Fetch new data if available, then process (default)"
-    echo "  reprocess  Delete all processed files and reprocess all raw snapshots"
+    echo "  reprocess  Reprocess raw snapshots whose processed file is out of date"
+    echo "             (all of them with \"force\")"
     echo "  logs       View recent logs"
     exit 1
     ;;
@@ -0,0 +1,247 @@
+"""
+Shared fixtures: a local stub of the Socrata resource API.
+"""
+
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from typing import IO
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from google.api_core.exceptions import NotFound
+
+import fetch
+from fetch import PageSizer, SocrataClient, TokenBucket
+
+
+UPDATED_AT = "2026-01-01T00:00:00.000"  # :updated_at of rows not in `updated`
+
+
+def row_id(index: int) -> str:
+    """Stub :id of row `index` (ids sort like the rows)."""
+    return f"row-{index:08d}"
+
+
+class SocrataStub(ThreadingHTTPServer):
+    """
+    Serves `rows` synthetic job records by keyset pagination on :id.
+
+    Understands the queries fetch.py sends: count(*), max(:updated_at),
+    $select=:id, and pages with $limit and an :id range and :updated_at lower
+    bound in $where. Rows in `updated` carry their :updated_at in
+    posting_updated, so edits show in the records. Responses queued in `errors`
+    (status, headers) are sent first, one per request. Counts requests,
+    accepted connections and the most requests in flight at once.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, rows: int = 0, text_size: int = 100):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.rows = rows
+        self.deleted: set[int] = set()  # rows left out of every response
+        self.updated: dict[int, str] = {}  # :updated_at of edited rows
+        self.text = "x" * text_size
+        self.errors: list[tuple[int, dict[str, str]]] = []
+        self.delay = 0.0  # seconds each response takes
+        self.body_delay = 0.0  # seconds between a response's headers and body
+        self.requests = 0
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0  # most requests in flight at once
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def respond(self, params: dict[str, str]) -> list[dict]:
+        where = params.get("$where", "")
+        after = [int(i) + 1 for i in re.findall(r":id > 'row-(\d+)'", where)]
+        until = [int(i) + 1 for i in re.findall(r":id <= 'row-(\d+)'", where)]
+        since = re.findall(r":updated_at > '([^']*)'", where)
+        start = max(after, default=0)
+        stop = min([*until, self.rows])
+
+        indexes = (
+            i
+            for i in range(start, stop)
+            if i not in self.deleted
+            and all(self.updated_at(i) > watermark for watermark in since)
+        )
+        select = params.get("$select", "")
+        if select.startswith("count("):
+            return [{"count": str(sum(1 for _ in indexes))}]
+        if select.startswith("max(:updated_at)"):
+            stamps = [self.updated_at(i) for i in indexes]
+            return [{"max_updated_at": max(stamps)}] if stamps else []
+        indexes = islice(indexes, int(params.get("$limit", self.rows)))
+        if select == ":id":
+            return [{":id": row_id(i)} for i in indexes]
+        return [self.record(i) for i in indexes]
+
+    def updated_at(self, index: int) -> str:
+        return self.updated.get(index, UPDATED_AT)
+
+    def record(self, index: int) -> dict:
+        """The job record of row `index`."""
+        return {
+            ":id": row_id(index),
+            "job_id": str(index),
+            "job_description": self.text,
+            "posting_updated": self.updated_at(index),
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server: SocrataStub
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+            error = self.server.errors.pop(0) if self.server.errors else None
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.active -= 1
+        if error:
+            status, headers = error
+            body = b"{}"
+        else:
+            status, headers = 200, {}
+            query = parse_qs(urlparse(self.path).query)
+            params = {key: values[0] for key, values in query.items()}
+            body = json.dumps(self.server.respond(params)).encode()
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        time.sleep(self.server.body_delay)
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def socrata_stub():
+    """A running SocrataStub; set rows/text/errors on it before fetching."""
+    server = SocrataStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub_client(socrata_stub):
+    """Make SocrataClients for the stub, without the production rate limit."""
+    clients = []
+
+    def make(**kwargs) -> SocrataClient:
+        client = SocrataClient(base_url=socrata_stub.base_url, **kwargs)
+        client.rate_limiter = TokenBucket(1e6, 1e6)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def fixed_page_size(monkeypatch):
+    """Call with a row count to make every page and id partition that size."""
+
+    def set_size(rows: int) -> None:
+        monkeypatch.setattr(fetch, "PAGE_SIZE", rows)
+        monkeypatch.setattr(fetch, "PageSizer", lambda: PageSizer(rows, rows, rows))
+
+    return set_size
+
+
+class FakeBlob:
+    """In-memory stand-in for the storage.Blob calls the pipeline makes."""
+
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.content_type = None
+
+    def exists(self) -> bool:
+        return self.name in self.bucket.data
+
+    def upload_from_string(self, data: str | bytes, content_type=None) -> None:
+        self.bucket.uploads += 1
+        self.bucket.data[self.name] = data.encode() if isinstance(data, str) else data
+
+    def download_as_text(self) -> str:
+        return self.bucket.data[self.name].decode()
+
+    def open(self, mode: str = "r", **kwargs) -> IO:
+        if mode == "r":
+            return io.StringIO(self.download_as_text())
+        return FakeUpload(self)
+
+    def compose(self, sources: list["FakeBlob"]) -> None:
+        self.bucket.data[self.name] = b"".join(
+            self.bucket.data[source.name] for source in sources
+        )
+
+    def delete(self) -> None:
+        if self.bucket.data.pop(self.name, None) is None:
+            raise NotFound(self.name)
+
+
+class FakeUpload(io.StringIO):
+    """Text upload to a FakeBlob, stored when closed."""
+
+    def __init__(self, blob: FakeBlob):
+        super().__init__()
+        self.blob = blob
+
+    def close(self) -> None:
+        if not self.closed:
+            self.blob.upload_from_string(self.getvalue())
+        super().close()
+
+
+class FakeBucket:
+    """In-memory bucket of FakeBlobs; counts uploads."""
+
+    name = "test-bucket"
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.uploads = 0
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix: str = "") -> list[FakeBlob]:
+        return [
+            self.blob(name) for name in sorted(self.data) if name.startswith(prefix)
+        ]
+
+
+@pytest.fixture
+def bucket() -> FakeBucket:
+    return FakeBucket()
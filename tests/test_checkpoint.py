@@ -0,0 +1,112 @@
+"""
+Checkpointed fetches into raw/_partial/ and their consistency checks.
+"""
+
+import pytest
+
+import fetch
+from fetch import (
+    PARTIAL_PREFIX,
+    FetchConsistencyError,
+    assemble_raw,
+    fetch_jobs_checkpointed,
+    load_cursor,
+    partial_prefix,
+    save_cursor,
+)
+from models import FetchCursor
+
+RAW_PATH = "raw/2026-01-01T00:00:00+00:00.ndjson"
+
+
+@pytest.fixture
+def checkpoints() -> list:
+    return []
+
+
+@pytest.fixture
+def fetch_run(socrata_stub, stub_client, bucket, fixed_page_size, checkpoints):
+    """Run fetch_jobs_checkpointed on 2000 stub rows in pages of 500."""
+    socrata_stub.rows = 2000
+    fixed_page_size(500)
+    client = stub_client()
+
+    def run(cursor: FetchCursor, deadline: float | None = None) -> bool:
+        return fetch_jobs_checkpointed(
+            client, bucket.blob(RAW_PATH), cursor, checkpoints.append, deadline
+        )
+
+    return run
+
+
+def test_resumed_fetch_assembles_every_row(fetch_run, bucket, checkpoints):
+    cursor = FetchCursor(raw_path=RAW_PATH, watermark=None)
+    assert not fetch_run(cursor, deadline=0)
+    assert (cursor.pages, cursor.record_count) == (1, 500)
+
+    assert fetch_run(cursor)
+    assert checkpoints[-1] is cursor
+    assert (cursor.pages, cursor.record_count) == (4, 2000)
+
+    raw_blob = bucket.blob(RAW_PATH)
+    assemble_raw(raw_blob, partial_prefix(RAW_PATH), cursor.pages)
+    assert len(raw_blob.download_as_text().splitlines()) == 2000
+
+
+def test_checkpoints_are_throttled(fetch_run, checkpoints, monkeypatch):
+    cursor = FetchCursor(raw_path=RAW_PATH, watermark=None)
+    monkeypatch.setattr(fetch, "CHECKPOINT_INTERVAL", 0.0)
+    assert fetch_run(cursor)
+    assert len(checkpoints) == 4
+
+    checkpoints.clear()
+    cursor = FetchCursor(raw_path=RAW_PATH, watermark=None)
+    monkeypatch.setattr(fetch, "CHECKPOINT_INTERVAL", 60.0)
+    assert fetch_run(cursor)
+    assert checkpoints == [cursor]
+
+
+def test_cursor_round_trips_through_its_blob(bucket):
+    assert load_cursor(bucket) is None
+    cursor = FetchCursor(raw_path=RAW_PATH, watermark=None, pages=3, last_id="a")
+    save_cursor(bucket, cursor)
+    assert load_cursor(bucket) == cursor
+    assert "metadata.json" not in bucket.data
+
+    save_cursor(bucket, None)
+    save_cursor(bucket, None)
+    assert load_cursor(bucket) is None
+
+
+def test_change_during_fetch_discards_pages(
+    fetch_run, socrata_stub, bucket, checkpoints, monkeypatch
+):
+    respond = socrata_stub.respond
+
+    def delete_after_count(params: dict) -> list[dict]:
+        rows = respond(params)
+        if params.get("$select", "").startswith("count("):
+            socrata_stub.deleted = {1500}
+        return rows
+
+    monkeypatch.setattr(socrata_stub, "respond", delete_after_count)
+
+    with pytest.raises(FetchConsistencyError):
+        fetch_run(FetchCursor(raw_path=RAW_PATH, watermark=None))
+    assert checkpoints[-1] is None
+    assert bucket.list_blobs(prefix=PARTIAL_PREFIX) == []
+
+
+def test_change_between_runs_discards_pages(
+    fetch_run, socrata_stub, bucket, checkpoints
+):
+    cursor = FetchCursor(raw_path=RAW_PATH, watermark=None)
+    fetch_run(cursor, deadline=0)
+    assert bucket.list_blobs(prefix=PARTIAL_PREFIX)
+
+    # Deleting a row before the cursor doesn't change the rows still to fetch
+    socrata_stub.deleted = {10}
+    with pytest.raises(FetchConsistencyError):
+        fetch_run(cursor)
+    assert checkpoints[-1] is None
+    assert bucket.list_blobs(prefix=PARTIAL_PREFIX) == []
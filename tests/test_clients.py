@@ -0,0 +1,57 @@
+"""
+The warm-instance cache builds each value once without blocking other keys.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import clients
+from clients import cached, pop_timings
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clients.invalidate()
+    pop_timings()
+    yield
+    clients.invalidate()
+    pop_timings()
+
+
+def test_slow_miss_does_not_block_other_keys():
+    building = threading.Event()
+    release = threading.Event()
+
+    def slow() -> str:
+        building.set()
+        assert release.wait(5)
+        return "slow"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(cached, "slow", slow)
+        assert building.wait(5)
+        start = time.monotonic()
+        assert cached("fast", lambda: "fast") == "fast"
+        assert time.monotonic() - start < 1
+        release.set()
+        assert future.result() == "slow"
+
+
+def test_concurrent_misses_build_once():
+    calls = []
+
+    def build() -> object:
+        calls.append(None)
+        time.sleep(0.2)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: cached("key", build), range(8)))
+
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+    timing = pop_timings()["key"]
+    assert timing["lookups"] == 8 and timing["misses"] == 1
@@ -0,0 +1,78 @@
+"""
+Delta fetches merge changed rows into the previous snapshot like a full fetch.
+"""
+
+import pytest
+
+import fetch
+from conftest import UPDATED_AT
+
+ROWS = 300
+LATER = "2026-02-01T00:00:00.000"
+
+
+@pytest.fixture
+def snapshot(socrata_stub, stub_client, bucket, fixed_page_size, monkeypatch):
+    """A full fetch of ROWS rows at UPDATED_AT, stored as the previous snapshot."""
+    fixed_page_size(50)
+    monkeypatch.setattr(fetch, "get_client", stub_client)
+    socrata_stub.rows = ROWS
+    socrata_stub.deleted = {5}
+    previous = bucket.blob("raw/2026-01-01.ndjson")
+    result = fetch.fetch_jobs(previous)
+    assert result.watermark == UPDATED_AT
+    return previous, result
+
+
+def full_fetch(bucket) -> tuple[bytes, fetch.FetchResult]:
+    raw_blob = bucket.blob("raw/full.ndjson")
+    result = fetch.fetch_jobs(raw_blob)
+    return bucket.data.pop(raw_blob.name), result
+
+
+def test_delta_matches_full_fetch(socrata_stub, bucket, snapshot):
+    previous, _ = snapshot
+    # Edit rows (first, middle, last), add two and remove three
+    socrata_stub.updated = {i: LATER for i in [0, 120, ROWS - 1, ROWS, ROWS + 1]}
+    socrata_stub.rows = ROWS + 2
+    socrata_stub.deleted = {5, 6, 200, ROWS - 2}
+
+    raw_blob = bucket.blob("raw/2026-02-01.ndjson")
+    result = fetch.fetch_jobs(raw_blob, previous, UPDATED_AT)
+    expected, full = full_fetch(bucket)
+
+    assert result.delta and not full.delta
+    assert bucket.data[raw_blob.name] == expected
+    assert result.record_count == full.record_count == ROWS - 2
+    assert result.content_hash == full.content_hash
+    assert result.watermark == LATER
+    assert not bucket.list_blobs(fetch.PARTIAL_PREFIX)
+
+
+def test_unchanged_delta_stores_nothing(socrata_stub, bucket, snapshot):
+    previous, first = snapshot
+
+    raw_blob = bucket.blob("raw/2026-02-01.ndjson")
+    result = fetch.fetch_jobs(
+        raw_blob, previous, UPDATED_AT, previous_hash=first.content_hash
+    )
+
+    assert result.delta and result.unchanged
+    assert result.record_count == first.record_count
+    assert not raw_blob.exists()
+    assert not bucket.list_blobs(fetch.PARTIAL_PREFIX)
+
+
+def test_unreconciled_delta_falls_back_to_full_fetch(socrata_stub, bucket, snapshot):
+    previous, _ = snapshot
+    # A row that the previous snapshot lacks but that isn't newer either
+    lines = bucket.data[previous.name].splitlines(keepends=True)
+    bucket.data[previous.name] = b"".join(lines[:100] + lines[101:])
+
+    raw_blob = bucket.blob("raw/2026-02-01.ndjson")
+    result = fetch.fetch_jobs(raw_blob, previous, UPDATED_AT)
+    expected, _ = full_fetch(bucket)
+
+    assert not result.delta
+    assert bucket.data[raw_blob.name] == expected
+    assert not bucket.list_blobs(fetch.PARTIAL_PREFIX)
@@ -0,0 +1,75 @@
+"""
+With a bundled EXTENSION_DIR, create_database loads extensions from it and
+never installs or downloads them.
+"""
+
+import duckdb
+import pytest
+
+import process
+
+
+class RecordingConnection:
+    """Passes statements through to a real connection, keeping a list of them."""
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection):
+        self.conn = conn
+        self.statements: list[str] = []
+
+    def execute(self, sql: str):
+        self.statements.append(sql)
+        return self.conn.execute(sql)
+
+
+@pytest.fixture
+def bundle(tmp_path, monkeypatch):
+    """An EXTENSION_DIR laid out like bundle-duckdb-extensions.sh's."""
+    with duckdb.connect() as conn:
+        (version,) = conn.execute(
+            "SELECT library_version FROM pragma_version()"
+        ).fetchone()
+        (platform,) = conn.execute("PRAGMA platform").fetchone()
+    monkeypatch.setattr(process, "EXTENSION_DIR", tmp_path)
+    return tmp_path, tmp_path / version / platform
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Connections create_database opens, with the config they were given."""
+    opened = []
+    real_connect = duckdb.connect
+
+    def connect(config: dict) -> RecordingConnection:
+        conn = RecordingConnection(real_connect(config=config))
+        opened.append((config, conn))
+        return conn
+
+    monkeypatch.setattr(process.duckdb, "connect", connect)
+    return opened
+
+
+def test_loads_from_bundle_only(bundle, connections):
+    root, extensions = bundle
+    extensions.mkdir(parents=True)
+    # Not a real extension: DuckDB reading it shows where LOAD looks
+    (extensions / "httpfs.duckdb_extension").write_bytes(b"\0" * 1024)
+
+    with pytest.raises(duckdb.InvalidInputException, match="not a DuckDB extension"):
+        process.create_database()
+
+    ((config, conn),) = connections
+    assert config["extension_directory"] == str(root)
+    assert config["autoinstall_known_extensions"] is False
+    assert conn.statements == ["LOAD httpfs"]
+
+
+def test_missing_extension_fails_without_download(bundle, connections):
+    root, extensions = bundle
+    extensions.mkdir(parents=True)
+
+    with pytest.raises(duckdb.IOException, match=str(extensions / "httpfs")):
+        process.create_database()
+
+    ((_, conn),) = connections
+    assert not any(sql.startswith("INSTALL") for sql in conn.statements)
+    assert sorted(root.rglob("*")) == [extensions.parent, extensions]
@@ -0,0 +1,70 @@
+"""
+The client's BM25 over exported postings ranks like match_bm25.
+
+Needs the fts extension (downloaded on first use); skipped without it.
+"""
+
+import duckdb
+import pytest
+
+from process import CLIENT_FTS_SCORES_SQL, FTS_COLUMNS, FTS_OPTIONS, write_fts_index
+
+JOBS = [
+    ("a", "Data Analyst", "Analyze data and write reports.", "DOHMH", "Analyst"),
+    ("b", "Senior Data Analyst", "Lead the data team.", "NYPD", "Analyst"),
+    ("c", "Civil Engineer", "Inspect bridges and roads.", "DOT", "Engineer"),
+    ("d", "Café Manager", "Run the café; manage staff.", "PARKS", "Manager"),
+    ("e", "Engineer, Civil", "Design water mains for the city.", "DEP", "Engineer"),
+    ("f", "Clerk", "File reports and answer calls.", "DOF", "Clerical Associate"),
+]
+SEARCHES = ["data analyst", "civil engineers", "CAFE", "reports", "Analyst's data"]
+
+
+@pytest.fixture
+def conn():
+    with duckdb.connect() as conn:
+        try:
+            conn.execute("INSTALL fts")
+            conn.execute("LOAD fts")
+        except duckdb.Error as e:
+            pytest.skip(f"fts extension unavailable: {e}")
+        yield conn
+
+
+def test_client_scores_match_match_bm25(conn, tmp_path):
+    processed = tmp_path / "processed.parquet"
+    values = ", ".join(str(job) for job in JOBS)
+    conn.execute(
+        f"COPY (SELECT * FROM (VALUES {values}) AS t(id, {', '.join(FTS_COLUMNS)})) "
+        f"TO '{processed}' (FORMAT PARQUET)"
+    )
+    postings = tmp_path / "fts.parquet"
+    num_docs, avgdl = write_fts_index(conn, processed, postings)
+
+    # What the client loads (attachFtsIndex), and the index it used to build
+    conn.execute(
+        "CREATE TABLE fts_postings AS SELECT *, "
+        f"count(*) OVER (PARTITION BY term) AS df FROM '{postings}'"
+    )
+    conn.execute(f"CREATE TABLE jobs AS FROM '{processed}'")
+    fields = ", ".join(f"'{column}'" for column in FTS_COLUMNS)
+    conn.execute(f"PRAGMA create_fts_index('jobs', 'id', {fields}, {FTS_OPTIONS})")
+
+    for search in SEARCHES:
+        escaped = search.replace("'", "''")
+        expected = conn.execute(
+            f"SELECT id, fts_main_jobs.match_bm25(id, '{escaped}') AS score "
+            "FROM jobs WHERE score IS NOT NULL ORDER BY id"
+        ).fetchall()
+        actual = conn.execute(
+            "SELECT * FROM ("
+            + CLIENT_FTS_SCORES_SQL.format(
+                search=escaped, num_docs=num_docs, avgdl=avgdl
+            )
+            + ") ORDER BY id"
+        ).fetchall()
+
+        assert expected, search
+        assert [id for id, _ in actual] == [id for id, _ in expected], search
+        for (_, score), (_, reference) in zip(actual, expected):
+            assert score == pytest.approx(reference), search
@@ -0,0 +1,163 @@
+"""
+Rebuilding jobs_history gives the same history as applying each snapshot.
+"""
+
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from process import (
+    HISTORY_OPEN,
+    HISTORY_SNAPSHOTS,
+    apply_snapshot_sql,
+    history_daily_sql,
+    history_intervals_sql,
+    history_snapshots_sql,
+    snapshot_sql,
+)
+
+HISTORY_COLUMNS = "version_hash, job_id, business_title, salary, valid_from, valid_to"
+HISTORY_CLOSED = "jobs_history/closed_month=2026-01/compacted.parquet"
+
+# Postings (job_id, business_title, salary) per daily snapshot. Day 2 matches
+# day 1, so it opens and closes nothing; job 1 changes on day 3 and changes
+# back on day 4.
+SNAPSHOTS = {
+    "2026-01-01": [(1, "Analyst", 50000), (2, "Clerk", 40000)],
+    "2026-01-02": [(1, "Analyst", 50000), (2, "Clerk", 40000)],
+    "2026-01-03": [(1, "Senior Analyst", 60000), (3, "Engineer", 90000)],
+    "2026-01-04": [(1, "Analyst", 50000), (3, "Engineer", 90000)],
+}
+
+
+@pytest.fixture
+def conn():
+    with duckdb.connect() as conn:
+        yield conn
+
+
+@pytest.fixture
+def sources(conn, tmp_path) -> list[str]:
+    """Processed files for SNAPSHOTS, including the columns history leaves out."""
+    (tmp_path / "processed").mkdir()
+    paths = []
+    for day, postings in SNAPSHOTS.items():
+        path = tmp_path / "processed" / f"{day}T12:00:00+00:00.parquet"
+        values = ", ".join(
+            f"({j}, '{title}', {salary})" for j, title, salary in postings
+        )
+        conn.execute(
+            f"""
+            COPY (
+                SELECT
+                    md5(job_id || '{day}') AS id,
+                    job_id,
+                    business_title,
+                    salary,
+                    '{day}'::date AS processed_date,
+                    'text ' || job_id AS job_description,
+                    'text' AS minimum_qual_requirements,
+                    'text' AS residency_requirement
+                FROM (VALUES {values}) AS t(job_id, business_title, salary)
+            ) TO '{path}' (FORMAT PARQUET)
+            """
+        )
+        paths.append(str(path))
+    return paths
+
+
+def rows(conn: duckdb.DuckDBPyConnection, query: str) -> list[tuple]:
+    return conn.execute(f"SELECT * FROM ({query}) ORDER BY ALL").fetchall()
+
+
+def write_history(conn: duckdb.DuckDBPyConnection, root: Path, queries: dict) -> str:
+    """Write {path: query} results as jobs_history files; returns the prefix."""
+    for path, query in queries.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        conn.execute(f"COPY ({query}) TO '{root / path}' (FORMAT PARQUET)")
+    return f"{root}/"
+
+
+def rebuild(conn, sources: list[str], root: Path) -> str:
+    """History as rebuild_jobs_history writes it."""
+    conn.execute(f"CREATE TABLE intervals AS {history_intervals_sql(sources)}")
+    return write_history(
+        conn,
+        root,
+        {
+            HISTORY_OPEN: "FROM intervals WHERE valid_to IS NULL",
+            HISTORY_CLOSED: "FROM intervals WHERE valid_to IS NOT NULL",
+            HISTORY_SNAPSHOTS: history_snapshots_sql(sources),
+        },
+    )
+
+
+def apply_each(conn, sources: list[str], root: Path) -> str:
+    """History as update_jobs_history writes it, one snapshot at a time."""
+    first, *rest = sources
+    root.mkdir()
+    conn.execute(f"CREATE TABLE first AS {history_intervals_sql([first])}")
+    conn.execute("CREATE TABLE closed AS FROM first WHERE valid_to IS NOT NULL")
+    conn.execute(f"CREATE TABLE snapshots AS {history_snapshots_sql([first])}")
+    open_file = root / "open-0.parquet"
+    conn.execute(
+        f"COPY (FROM first WHERE valid_to IS NULL) TO '{open_file}' (FORMAT PARQUET)"
+    )
+
+    for i, source in enumerate(rest, 1):
+        closed, still_open = apply_snapshot_sql(conn, str(open_file), source)
+        conn.execute(f"INSERT INTO closed BY NAME {closed}")
+        snapshot = snapshot_sql(f"'{source}'")
+        conn.execute(f"INSERT INTO snapshots SELECT {snapshot}")
+        open_file = root / f"open-{i}.parquet"
+        conn.execute(f"COPY ({still_open}) TO '{open_file}' (FORMAT PARQUET)")
+
+    return write_history(
+        conn,
+        root,
+        {
+            HISTORY_OPEN: f"FROM '{open_file}'",
+            HISTORY_CLOSED: "FROM closed",
+            HISTORY_SNAPSHOTS: "SELECT DISTINCT snapshot FROM snapshots",
+        },
+    )
+
+
+def test_rebuild_matches_applying_each_snapshot(conn, sources, tmp_path):
+    rebuilt = rebuild(conn, sources, tmp_path / "rebuilt")
+    applied = apply_each(conn, sources, tmp_path / "applied")
+
+    for path in [HISTORY_OPEN, HISTORY_CLOSED]:
+        query = f"SELECT {HISTORY_COLUMNS} FROM '{{}}{path}'"
+        assert rows(conn, query.format(rebuilt)) == rows(conn, query.format(applied))
+    query = f"FROM '{{}}{HISTORY_SNAPSHOTS}'"
+    assert rows(conn, query.format(rebuilt)) == rows(conn, query.format(applied))
+
+    daily = "SELECT processed_date, job_id, business_title, salary FROM ({})"
+    assert rows(conn, daily.format(history_daily_sql(rebuilt))) == rows(
+        conn, daily.format(history_daily_sql(applied))
+    )
+
+
+def test_rebuild_keeps_every_snapshot_day(conn, sources, tmp_path):
+    prefix = rebuild(conn, sources, tmp_path)
+
+    daily = rows(
+        conn,
+        "SELECT processed_date::varchar, job_id, business_title, salary "
+        f"FROM ({history_daily_sql(prefix)})",
+    )
+    assert daily == sorted(
+        (day, *posting) for day, postings in SNAPSHOTS.items() for posting in postings
+    )
+    intervals = rows(
+        conn, "SELECT job_id, business_title, valid_from::date::varchar FROM intervals"
+    )
+    assert intervals == [
+        (1, "Analyst", "2026-01-01"),
+        (1, "Analyst", "2026-01-04"),
+        (1, "Senior Analyst", "2026-01-03"),
+        (2, "Clerk", "2026-01-01"),
+        (3, "Engineer", "2026-01-03"),
+    ]
@@ -0,0 +1,61 @@
+"""
+iter_job_pages: partitioning and split column-group fetches.
+"""
+
+import pytest
+
+import fetch
+from fetch import iter_job_pages
+from schema import LARGE_TEXT_COLUMNS
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_split_groups_are_fetched_concurrently(
+    socrata_stub, stub_client, fixed_page_size, monkeypatch, concurrency
+):
+    # Fits in one partition, so only the split can make requests concurrent
+    socrata_stub.rows = 300
+    socrata_stub.delay = 0.05
+    fixed_page_size(100)
+    monkeypatch.setattr(fetch, "PAGE_SIZE", 1000)
+    client = stub_client()
+
+    pages = list(iter_job_pages(client, concurrency, split=True))
+
+    assert [len(page) for page in pages] == [100, 100, 100]
+    assert [row["job_id"] for page in pages for row in page] == [
+        str(i) for i in range(300)
+    ]
+    assert socrata_stub.max_active == 2
+
+
+def test_unsplit_single_partition_is_one_stream(
+    socrata_stub, stub_client, fixed_page_size
+):
+    socrata_stub.rows = 300
+    socrata_stub.delay = 0.05
+    fixed_page_size(1000)
+    client = stub_client()
+
+    pages = list(iter_job_pages(client, 4, split=False))
+
+    assert sum(map(len, pages)) == 300
+    # count(*) and one page
+    assert socrata_stub.requests == 2
+    assert socrata_stub.max_active == 1
+
+
+def test_split_partitions_reuse_pooled_connections(
+    socrata_stub, stub_client, fixed_page_size, caplog
+):
+    socrata_stub.rows = 2000
+    socrata_stub.delay = 0.01
+    fixed_page_size(100)
+    client = stub_client()
+
+    pages = iter_job_pages(client, fetch.FETCH_CONCURRENCY, split=True)
+    assert sum(map(len, pages)) == 2000
+
+    assert socrata_stub.max_active == fetch.FETCH_POOL_SIZE
+    assert socrata_stub.connections <= fetch.FETCH_POOL_SIZE
+    assert "Connection pool is full" not in caplog.text
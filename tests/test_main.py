@@ -0,0 +1,63 @@
+"""
+process_latest polls: warm instances skip GCS when nothing changed.
+"""
+
+import pytest
+
+import clients
+import main
+from models import PipelineState, SourceFingerprint
+
+FINGERPRINT = SourceFingerprint(etag='"1"', last_modified=None, data_updated_at="a")
+
+
+class NoBucket:
+    """A bucket any use of which fails the test."""
+
+    name = "no-bucket"
+
+    def blob(self, name: str):
+        raise AssertionError(f"GCS read of {name} on a warm poll")
+
+
+@pytest.fixture
+def poll(bucket, monkeypatch):
+    """Run process_latest against `bucket` with Socrata reporting no change."""
+    clients.invalidate()
+    state = PipelineState.empty()
+    state.source_fingerprint = FINGERPRINT
+    bucket.blob("metadata.json").upload_from_string(state.to_json())
+    seen = []
+
+    def check_for_changes(client, previous):
+        seen.append(previous)
+        return False, current
+
+    current = FINGERPRINT
+    monkeypatch.setattr(main, "get_client", lambda: None)
+    monkeypatch.setattr(main, "check_for_changes", check_for_changes)
+
+    def run(gcs=bucket, fingerprint: SourceFingerprint = FINGERPRINT):
+        nonlocal current
+        current = fingerprint
+        monkeypatch.setattr(main, "get_bucket", lambda: gcs)
+        assert main.process_latest() == ("No new data", 200)
+        return seen[-1]
+
+    yield run
+    clients.invalidate()
+
+
+def test_warm_poll_reads_nothing_from_gcs(poll, bucket):
+    assert poll() == FINGERPRINT
+    assert poll(NoBucket()) == FINGERPRINT
+    assert bucket.uploads == 1
+
+
+def test_refreshed_validators_are_saved_and_cached(poll, bucket):
+    refreshed = SourceFingerprint(etag='"2"', last_modified=None, data_updated_at="a")
+    assert poll(fingerprint=refreshed) == FINGERPRINT
+    saved = PipelineState.from_json(bucket.blob("metadata.json").download_as_text())
+    assert saved.source_fingerprint == refreshed
+
+    assert poll(NoBucket(), refreshed) == refreshed
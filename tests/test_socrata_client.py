@@ -0,0 +1,70 @@
+"""
+SocrataClient retries and connection reuse, against the local stub.
+"""
+
+import time
+
+import pytest
+import requests
+
+from fetch import TokenBucket, fetch_page, fetch_row_count
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_honor_retry_after_on_one_connection(socrata_stub, stub_client, status):
+    socrata_stub.rows = 7
+    socrata_stub.errors = [(status, {"Retry-After": "0.3"})] * 2
+    client = stub_client()
+
+    start = time.monotonic()
+    count = fetch_row_count(client)
+    elapsed = time.monotonic() - start
+
+    assert count == 7
+    assert socrata_stub.requests == 3
+    assert elapsed >= 0.6
+    assert socrata_stub.connections == 1
+
+
+def test_gives_up_after_max_retries(socrata_stub, stub_client):
+    socrata_stub.errors = [(503, {"Retry-After": "0"})] * 3
+    client = stub_client(max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        fetch_row_count(client)
+    assert socrata_stub.requests == 3
+
+
+def test_keeps_connection_alive_across_requests(socrata_stub, stub_client):
+    socrata_stub.rows = 7
+    client = stub_client()
+
+    for _ in range(5):
+        assert fetch_row_count(client) == 7
+    assert socrata_stub.requests == 5
+    assert socrata_stub.connections == 1
+
+
+def test_concurrent_pauses_overlap():
+    bucket = TokenBucket(rate=10, capacity=10)
+    for _ in range(4):
+        bucket.pause(1.0)
+    # One second's worth of tokens owed, not four
+    assert -10.5 < bucket.tokens <= -9.5
+
+    bucket.pause(0.5)
+    assert bucket.tokens <= -9.5
+    bucket.pause(2.0)
+    assert -20.5 < bucket.tokens <= -19.5
+
+
+def test_page_latency_includes_the_body(socrata_stub, stub_client, monkeypatch):
+    socrata_stub.rows = 7
+    socrata_stub.body_delay = 0.3
+    client = stub_client()
+    recorded = []
+    monkeypatch.setattr(client, "record_page", lambda *args: recorded.append(args))
+
+    assert len(fetch_page(client, {}, 10)) == 7
+    ((*_, seconds),) = recorded
+    assert seconds >= 0.3
@@ -0,0 +1,176 @@
+"""
+Fetching streams pages to the raw blob with bounded memory.
+"""
+
+import io
+import json
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pytest
+
+import fetch
+from conftest import UPDATED_AT, FakeBlob, FakeBucket, SocrataStub
+from fetch import iter_job_pages, write_ndjson
+from process import ArrowPages
+from schema import transform_columns
+
+PAGE_ROWS = 500
+PAGES = 80
+ROWS = PAGES * PAGE_ROWS
+TEXT_SIZE = 2000
+PAGE_BYTES = PAGE_ROWS * TEXT_SIZE  # ~1 MB a page, ~80 MB in all
+
+
+class CountingWriter(io.TextIOBase):
+    """A text file that only counts what is written to it."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, s: str) -> int:
+        self.size += len(s)
+        return len(s)
+
+
+class SizeOnlyBlob(FakeBlob):
+    """A FakeBlob that keeps only the size of its contents."""
+
+    def upload_from_string(self, data: str | bytes, content_type=None) -> None:
+        self.bucket.uploads += 1
+        self.bucket.data[self.name] = len(data)
+
+    def compose(self, sources: list[FakeBlob]) -> None:
+        self.bucket.data[self.name] = sum(
+            self.bucket.data[source.name] for source in sources
+        )
+
+
+class SizeOnlyBucket(FakeBucket):
+    def blob(self, name: str) -> SizeOnlyBlob:
+        return SizeOnlyBlob(self, name)
+
+
+@pytest.fixture
+def small_pages(fixed_page_size):
+    """Fixed pages of PAGE_ROWS rows, so the dataset spans many pages."""
+    fixed_page_size(PAGE_ROWS)
+
+
+def test_write_ndjson_holds_one_page_at_a_time():
+    def pages():
+        for _ in range(PAGES):
+            yield [{"job_description": "x" * TEXT_SIZE} for _ in range(PAGE_ROWS)]
+
+    out = CountingWriter()
+    tracemalloc.start()
+    try:
+        count = write_ndjson(out, pages())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == ROWS
+    assert out.size > ROWS * TEXT_SIZE
+    assert peak < 4 * PAGE_BYTES
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_fetch_to_ndjson_peak_memory_is_bounded(
+    socrata_stub, stub_client, small_pages, concurrency
+):
+    socrata_stub.rows = ROWS
+    socrata_stub.text = "x" * TEXT_SIZE
+    client = stub_client(pool_size=concurrency)
+    out = CountingWriter()
+
+    tracemalloc.start()
+    try:
+        pages = iter_job_pages(client, concurrency, query={"$select": "*"})
+        count = write_ndjson(out, pages)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == ROWS
+    # Each in-flight partition holds a page as response bytes and as records;
+    # the total doesn't grow with the dataset
+    assert out.size > ROWS * TEXT_SIZE
+    assert peak < 2 * (concurrency + 4) * PAGE_BYTES
+
+
+def test_checkpointed_fetch_peak_memory_is_bounded(
+    socrata_stub, stub_client, small_pages, monkeypatch
+):
+    # The full fetch process_latest runs: pages stored as they're fetched,
+    # composed by assemble_raw, and kept as Arrow batches for processing
+    socrata_stub.rows = ROWS
+    socrata_stub.text = "x" * TEXT_SIZE
+    monkeypatch.setattr(fetch, "get_client", stub_client)
+    bucket = SizeOnlyBucket()
+    pages = ArrowPages(transform_columns())
+    ArrowPages([]).add([{}])  # the first conversion imports pandas
+    arrow_before = pa.total_allocated_bytes()
+
+    tracemalloc.start()
+    try:
+        result = fetch.fetch_jobs(bucket.blob("raw/new.ndjson"), on_page=pages.add)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result.complete and result.record_count == ROWS
+    assert bucket.data["raw/new.ndjson"] > ROWS * TEXT_SIZE
+    assert peak < 2 * (fetch.FETCH_CONCURRENCY + 4) * PAGE_BYTES
+    # Arrow memory (not seen by tracemalloc) is just the kept pages
+    assert pages.num_rows == ROWS
+    kept = pa.total_allocated_bytes() - arrow_before
+    assert kept <= pages.table().nbytes + PAGE_BYTES
+
+
+class GeneratedSnapshot:
+    """A previous snapshot of the stub's rows, generated as it's read."""
+
+    name = "raw/previous.ndjson"
+
+    def __init__(self, stub: SocrataStub):
+        self.stub = stub
+
+    def exists(self) -> bool:
+        return True
+
+    @contextmanager
+    def open(self, mode: str = "r") -> Iterator[Iterator[str]]:
+        yield (json.dumps(self.stub.record(i)) + "\n" for i in range(self.stub.rows))
+
+
+def test_delta_fetch_peak_memory_is_bounded(
+    socrata_stub, stub_client, small_pages, bucket, monkeypatch
+):
+    socrata_stub.rows = ROWS
+    socrata_stub.text = "x" * TEXT_SIZE
+    previous = GeneratedSnapshot(socrata_stub)
+    socrata_stub.updated = {i: "2026-02-01T00:00:00.000" for i in range(0, ROWS, 97)}
+    out = CountingWriter()
+
+    @contextmanager
+    def open_raw_writer(blob):
+        yield out
+        blob.upload_from_string("")
+
+    monkeypatch.setattr(fetch, "get_client", stub_client)
+    monkeypatch.setattr(fetch, "open_raw_writer", open_raw_writer)
+
+    tracemalloc.start()
+    try:
+        result = fetch.fetch_jobs(bucket.blob("raw/new.ndjson"), previous, UPDATED_AT)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result.delta and result.record_count == ROWS
+    assert out.size > ROWS * TEXT_SIZE
+    # The merge holds the changed rows and a page of the snapshot at a time
+    assert peak < 2 * (fetch.FETCH_CONCURRENCY + 4) * PAGE_BYTES
@@ -1,5 +1,5 @@
 import { describe, it, expect } from "vitest";
-import { getJobUrl, duckDbDateToString, Job } from "./db";
+import { getJobUrl, duckDbDateToString, ftsScoresSql, facetValues, Facets, Job } from "./db";
 
 describe("getJobUrl", () => {
   it("generates search URL with title and agency", () => {
@@ -51,3 +51,43 @@ describe("duckDbDateToString", () => {
   });
 });
 
+
+describe("ftsScoresSql", () => {
+  // functions/process.py CLIENT_FTS_SCORES_SQL copies this query (tests/test_fts.py
+  // runs it against match_bm25); keep them in step
+  it("scores the search against the attached postings with its stats", () => {
+    const sql = ftsScoresSql("data analyst", { numDocs: 5000, avgdl: 312.5 });
+    expect(sql.replace(/\s+/g, " ").trim()).toBe(
+      "WITH tokens AS ( SELECT DISTINCT stem(unnest(string_split_regex( " +
+        "regexp_replace(lower(strip_accents('data analyst')), '(\\.|[^a-z])+', ' ', 'g'), " +
+        "'\\s+' )), 'english') AS term ) " +
+        "SELECT id, sum( log((5000 - df + 0.5) / (df + 0.5)) " +
+        "* (tf * (1.2 + 1)) / (tf + 1.2 * (1 - 0.75 + 0.75 * len / 312.5)) ) AS fts_score " +
+        "FROM fts_postings JOIN tokens USING (term) GROUP BY id"
+    );
+  });
+});
+
+describe("facetValues", () => {
+  const facets = {
+    record_count: 3,
+    facets: {
+      agency: [["DEPT OF HEALTH", 2], ["NYPD", 1]],
+      is_full_time: [[false, 1], [true, 2]],
+    },
+    salary_histogram: { bin_width: 10000, salary_range_from: [], salary_range_to: [] },
+    posted_date: [],
+  } as Facets;
+
+  it("returns a facet's values in order, without counts", () => {
+    expect(facetValues(facets, "agency")).toEqual(["DEPT OF HEALTH", "NYPD"]);
+  });
+
+  it("stringifies boolean values", () => {
+    expect(facetValues(facets, "is_full_time")).toEqual(["false", "true"]);
+  });
+
+  it("returns no values for a missing facet", () => {
+    expect(facetValues(facets, "job_categories")).toEqual([]);
+  });
+});
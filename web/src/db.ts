@@ -11,6 +11,42 @@ let db: duckdb.AsyncDuckDB | null = null;
 let conn: duckdb.AsyncDuckDBConnection | null = null;
 let sourceUpdatedAt: Date | null = null;
 let ftsEnabled = false;
+// Stats of the pipeline-built FTS index, when attached (see attachFtsIndex)
+let ftsStats: FtsStats | null = null;
+// Set by initDb: the data loading in the background, and the snapshot's
+// precomputed filter values (see Facets)
+let ready: Promise<void> = Promise.reject(new Error("Database not initialized"));
+ready.catch(() => {});
+let facets: Facets | null = null;
+// Whether the jobs table leaves out DETAIL_COLUMNS, which are then read
+// per job from the snapshot's detail file (see registerDetailFile)
+let hasDetailFile = false;
+
+// Columns only the job-detail view needs, split out by the pipeline
+const DETAIL_COLUMNS = ["job_description", "minimum_qual_requirements", "residency_requirement"];
+
+export interface FtsStats {
+  numDocs: number;
+  avgdl: number;
+}
+
+// A snapshot's facets/<snapshot>.json, written by process.write_facets.
+// Facet values are sorted, with their number of postings; salary bins are
+// [bin start, postings], posted dates ["YYYY-MM-DD", postings].
+export interface Facets {
+  record_count: number;
+  facets: Record<string, [string | boolean, number][]>;
+  salary_histogram: {
+    bin_width: number;
+    salary_range_from: [number, number][];
+    salary_range_to: [number, number][];
+  };
+  posted_date: [string, number][];
+}
+
+// BM25 parameters, the defaults of fts_main_jobs.match_bm25
+const BM25_K = 1.2;
+const BM25_B = 0.75;
 
 async function doQuery(c: duckdb.AsyncDuckDBConnection, query: string) {
   const t = performance.now();
@@ -24,19 +60,7 @@ async function doQuery(c: duckdb.AsyncDuckDBConnection, query: string) {
 export async function initDb(): Promise<void> {
   const t0 = performance.now();
 
-  // Initialize DuckDB WASM with local bundles (Vite handles the URLs)
-  const worker = new Worker(duckdb_worker, { type: "module" });
-  const logger = new duckdb.ConsoleLogger();
-  db = new duckdb.AsyncDuckDB(logger, worker);
-  await db.instantiate(duckdb_wasm);
-  console.log(`[perf] WASM instantiate: ${((performance.now() - t0) / 1000).toFixed(1)}s`);
-
-  const t1 = performance.now();
-  conn = await db.connect();
-  console.log(`[perf] connect: ${((performance.now() - t1) / 1000).toFixed(1)}s`);
-
   // Fetch metadata to get source_updated_at (used to compute parquet path)
-  const t2 = performance.now();
   const metadataRes = await fetch(`${BUCKET_URL}/metadata.json`);
   const metadata = await metadataRes.json();
 
@@ -44,10 +68,90 @@ export async function initDb(): Promise<void> {
     throw new Error("No source_updated_at in metadata.json");
   }
 
-  // Store source updated date and compute parquet path
+  // Store source updated date
   sourceUpdatedAt = new Date(metadata.source_updated_at);
+  console.log(`[perf] fetch metadata: ${((performance.now() - t0) / 1000).toFixed(1)}s`);
+
+  // Load the data in the background; queries wait for it (see whenReady).
+  // Facets are enough to render the filters, so only they are awaited.
+  ready = loadData(metadata, t0);
+  ready.catch((error) => console.error("Failed to load jobs data:", error));
+  if (metadata.facets_path) {
+    const t1 = performance.now();
+    facets = await fetchFacets(`${BUCKET_URL}/${metadata.facets_path}`);
+    console.log(`[perf] fetch facets: ${((performance.now() - t1) / 1000).toFixed(1)}s`);
+  }
+}
+
+// Resolves once the jobs table is queryable (rejects if loading failed)
+export function whenReady(): Promise<void> {
+  return ready;
+}
+
+async function loadData(metadata: Record<string, string>, t0: number): Promise<void> {
+  // Initialize DuckDB WASM with local bundles (Vite handles the URLs)
+  const t1 = performance.now();
+  const worker = new Worker(duckdb_worker, { type: "module" });
+  const logger = new duckdb.ConsoleLogger();
+  const instance = new duckdb.AsyncDuckDB(logger, worker);
+  await instance.instantiate(duckdb_wasm);
+  db = instance;
+  console.log(`[perf] WASM instantiate: ${((performance.now() - t1) / 1000).toFixed(1)}s`);
+
+  const t2 = performance.now();
+  conn = await db.connect();
+  console.log(`[perf] connect: ${((performance.now() - t2) / 1000).toFixed(1)}s`);
+
   const parquetPath = `processed/${metadata.source_updated_at}.parquet`;
-  console.log(`[perf] fetch metadata: ${((performance.now() - t2) / 1000).toFixed(1)}s`);
+
+  // Attach the snapshot's database read-only if the pipeline built one, so
+  // queries fetch only the blocks they touch (?load=parquet imports the
+  // Parquet file instead, to compare the two)
+  const params = new URLSearchParams(window.location.search);
+  const browserFts = params.get("fts_index") === "browser";
+  // Snapshots split into list and detail files (the database's jobs table
+  // is the list file too) fetch detail columns one job at a time
+  let listOnly = false;
+  if (metadata.database_path && params.get("load") !== "parquet") {
+    const t3 = performance.now();
+    await attachDatabase(`${BUCKET_URL}/${metadata.database_path}`);
+    console.log(`[perf] ATTACH database: ${((performance.now() - t3) / 1000).toFixed(1)}s`);
+    listOnly = Boolean(metadata.detail_path);
+  } else if (metadata.list_path && metadata.detail_path && !browserFts) {
+    await importParquet(metadata.list_path, metadata.fts_path, false);
+    listOnly = true;
+  } else {
+    // Indexing in the browser needs the full file, detail columns included
+    await importParquet(parquetPath, metadata.fts_path, browserFts);
+  }
+  if (listOnly) {
+    await registerDetailFile(`${BUCKET_URL}/${metadata.detail_path}`);
+  }
+
+  console.log(`[perf] TOTAL: ${((performance.now() - t0) / 1000).toFixed(1)}s`);
+  console.log("DuckDB initialized with jobs data");
+}
+
+// Fetch the snapshot's facets (null if unavailable: the filter lists are
+// then queried from the jobs table)
+async function fetchFacets(url: string): Promise<Facets | null> {
+  try {
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return await res.json();
+  } catch (error) {
+    console.warn("Failed to fetch facets, querying filter options instead:", error);
+    return null;
+  }
+}
+
+// Import the processed Parquet file into a jobs table and set up FTS
+async function importParquet(
+  parquetPath: string,
+  ftsPath: string | undefined,
+  browserFts: boolean
+): Promise<void> {
+  if (!conn || !db) return;
 
   // Register the parquet file
   const t3 = performance.now();
@@ -61,13 +165,107 @@ export async function initDb(): Promise<void> {
   await doQuery(conn, `CREATE TABLE jobs AS SELECT * FROM 'jobs.parquet'`);
   console.log(`[perf] CREATE TABLE: ${((performance.now() - t4) / 1000).toFixed(1)}s`);
 
-  // Create FTS index for advanced search
+  // Attach the pipeline-built FTS index, or index in the browser for
+  // snapshots without one (?fts_index=browser forces it, to compare the two)
   const t5 = performance.now();
-  await createFtsIndex();
-  console.log(`[perf] FTS index: ${((performance.now() - t5) / 1000).toFixed(1)}s`);
+  if (ftsPath && !browserFts) {
+    await attachFtsIndex(`${BUCKET_URL}/${ftsPath}`);
+    console.log(`[perf] FTS attach: ${((performance.now() - t5) / 1000).toFixed(1)}s`);
+  } else {
+    await createFtsIndex();
+    console.log(`[perf] FTS index: ${((performance.now() - t5) / 1000).toFixed(1)}s`);
+  }
+}
 
-  console.log(`[perf] TOTAL: ${((performance.now() - t0) / 1000).toFixed(1)}s`);
-  console.log("DuckDB initialized with jobs data");
+// Register the detail file (id plus DETAIL_COLUMNS, sorted by id in small
+// row groups). Its footer is cached after the first lookup, so each getJob
+// after that reads a single row group.
+async function registerDetailFile(url: string): Promise<void> {
+  if (!conn || !db) return;
+
+  await db.registerFileURL("detail.parquet", url, duckdb.DuckDBDataProtocol.HTTP, false);
+  await doQuery(conn, `SET parquet_metadata_cache = true`);
+  hasDetailFile = true;
+}
+
+// Attach the pipeline-built database (jobs, fts_postings, fts_stats) and
+// make it the default catalog, so queries stay unqualified
+async function attachDatabase(url: string): Promise<void> {
+  if (!conn || !db) return;
+
+  await db.registerFileURL("snapshot.duckdb", url, duckdb.DuckDBDataProtocol.HTTP, false);
+  await doQuery(conn, `ATTACH 'snapshot.duckdb' AS snapshot (READ_ONLY)`);
+  await doQuery(conn, `USE snapshot`);
+
+  try {
+    // stem() is needed to tokenize queries like the index
+    await conn.query(`INSTALL fts`);
+    await conn.query(`LOAD fts`);
+
+    const row = (await doQuery(conn, `SELECT num_docs, avgdl FROM fts_stats`)).get(0);
+    ftsStats = { numDocs: Number(row?.num_docs), avgdl: Number(row?.avgdl) };
+    ftsEnabled = true;
+    console.log("FTS index attached successfully");
+  } catch (error) {
+    console.warn("Failed to attach FTS index, falling back to ILIKE search:", error);
+    ftsStats = null;
+    ftsEnabled = false;
+  }
+}
+
+// Load BM25 postings (term, id, tf, len) built by the pipeline, with
+// num_docs and avgdl from the file's key-value metadata. The fts extension
+// is still loaded for stem(), to tokenize queries like the index.
+async function attachFtsIndex(url: string): Promise<void> {
+  if (!conn || !db) return;
+
+  try {
+    await conn.query(`INSTALL fts`);
+    await conn.query(`LOAD fts`);
+
+    await db.registerFileURL("fts.parquet", url, duckdb.DuckDBDataProtocol.HTTP, false);
+    await doQuery(conn, `
+      CREATE TABLE fts_postings AS
+      SELECT *, count(*) OVER (PARTITION BY term) AS df FROM 'fts.parquet'
+    `);
+    const result = await doQuery(conn, `
+      SELECT decode(key) AS key, decode(value) AS value
+      FROM parquet_kv_metadata('fts.parquet')
+    `);
+    const kv: Record<string, string> = {};
+    for (let i = 0; i < result.numRows; i++) {
+      const row = result.get(i);
+      if (row) kv[String(row.key)] = String(row.value);
+    }
+    ftsStats = { numDocs: Number(kv.num_docs), avgdl: Number(kv.avgdl) };
+
+    ftsEnabled = true;
+    console.log("FTS index attached successfully");
+  } catch (error) {
+    console.warn("Failed to attach FTS index, falling back to ILIKE search:", error);
+    ftsStats = null;
+    ftsEnabled = false;
+  }
+}
+
+// SQL scoring a search against the attached postings: BM25 as computed by
+// fts_main_jobs.match_bm25, with the query tokenized and stemmed the same way
+export function ftsScoresSql(escapedSearch: string, stats: FtsStats): string {
+  return `
+    WITH tokens AS (
+      SELECT DISTINCT stem(unnest(string_split_regex(
+        regexp_replace(lower(strip_accents('${escapedSearch}')), '(\\.|[^a-z])+', ' ', 'g'),
+        '\\s+'
+      )), 'english') AS term
+    )
+    SELECT id, sum(
+      log((${stats.numDocs} - df + 0.5) / (df + 0.5))
+        * (tf * (${BM25_K} + 1))
+        / (tf + ${BM25_K} * (1 - ${BM25_B} + ${BM25_B} * len / ${stats.avgdl}))
+    ) AS fts_score
+    FROM fts_postings JOIN tokens USING (term)
+    GROUP BY id
+  `;
 }
 
 async function createFtsIndex(): Promise<void> {
@@ -170,6 +368,7 @@ export async function queryJobs(options: {
   orderBy?: string;
   orderDir?: "ASC" | "DESC";
 }): Promise<QueryResult<Job>> {
+  await ready;
   if (!conn) throw new Error("Database not initialized");
 
   const conditions: string[] = [];
@@ -182,11 +381,14 @@ export async function queryJobs(options: {
       // FTS search handled separately via CTE
       useRelevanceOrder = true;
     } else {
-      // Fall back to ILIKE search
+      // Fall back to ILIKE search (reading the whole detail file, if split)
+      const descriptionMatch = hasDetailFile
+        ? `id IN (SELECT id FROM 'detail.parquet' WHERE job_description ILIKE '%${escaped}%')`
+        : `job_description ILIKE '%${escaped}%'`;
       conditions.push(`(
         business_title ILIKE '%${escaped}%'
         OR agency ILIKE '%${escaped}%'
-        OR job_description ILIKE '%${escaped}%'
+        OR ${descriptionMatch}
       )`);
     }
   }
@@ -283,7 +485,12 @@ export async function queryJobs(options: {
   if (useRelevanceOrder && options.search) {
     // FTS query: compute scores in subquery, filter on score in outer query
     const escaped = escapeSql(options.search);
-    const baseTable = `(
+    const baseTable = ftsStats
+      ? `(
+      SELECT jobs.*, scores.fts_score
+      FROM jobs JOIN (${ftsScoresSql(escaped, ftsStats)}) AS scores USING (id)
+    ) AS scored_jobs`
+      : `(
       SELECT jobs.*, fts_main_jobs.match_bm25(jobs.id, '${escaped}') AS fts_score
       FROM jobs
     ) AS scored_jobs`;
@@ -332,6 +539,7 @@ export async function queryJobs(options: {
 }
 
 export async function getJob(id: string): Promise<Job | null> {
+  await ready;
   if (!conn) throw new Error("Database not initialized");
 
   const result = await doQuery(conn, `SELECT * FROM jobs WHERE id = '${escapeSql(id)}'`);
@@ -339,10 +547,28 @@ export async function getJob(id: string): Promise<Job | null> {
   if (result.numRows === 0) return null;
 
   const row = result.get(0);
-  return row ? rowToJob(row) : null;
+  if (!row) return null;
+  if (!hasDetailFile) return rowToJob(row);
+
+  const detail = await doQuery(conn, `
+    SELECT ${DETAIL_COLUMNS.join(", ")} FROM 'detail.parquet'
+    WHERE id = '${escapeSql(id)}'
+  `);
+  return rowToJob({ ...row.toJSON(), ...detail.get(0)?.toJSON() });
+}
+
+export function getFacets(): Facets | null {
+  return facets;
+}
+
+// Values of a facet, in the order of the SELECT DISTINCT queries they replace
+export function facetValues(facets: Facets, name: string): string[] {
+  return (facets.facets[name] ?? []).map(([value]) => String(value));
 }
 
 export async function getAgencies(): Promise<string[]> {
+  if (facets) return facetValues(facets, "agency");
+  await ready;
   if (!conn) throw new Error("Database not initialized");
 
   const result = await doQuery(conn, `
@@ -360,6 +586,8 @@ export async function getAgencies(): Promise<string[]> {
 }
 
 export async function getCategories(): Promise<string[]> {
+  if (facets) return facetValues(facets, "job_categories");
+  await ready;
   if (!conn) throw new Error("Database not initialized");
 
   const result = await doQuery(conn, `
@@ -378,6 +606,8 @@ export async function getCategories(): Promise<string[]> {
 }
 
 export async function getCivilServiceTitles(): Promise<string[]> {
+  if (facets) return facetValues(facets, "civil_service_title");
+  await ready;
   if (!conn) throw new Error("Database not initialized");
 
   const result = await doQuery(conn, `
@@ -1,12 +1,14 @@
 import { embed } from "@duckdb/duckdb-wasm-shell";
 import shellWasm from "@duckdb/duckdb-wasm-shell/dist/shell_bg.wasm?url";
 import "xterm/css/xterm.css";
-import { getDb } from "../db";
+import { getDb, whenReady } from "../db";
 
 export async function renderConsole(): Promise<void> {
   const app = document.getElementById("app");
   if (!app) return;
 
+  // A failed load is reported below, like an unfinished one
+  await whenReady().catch(() => {});
   const db = getDb();
   if (!db) {
     app.innerHTML = `
@@ -6,7 +6,15 @@ import {
   type SortingState,
   type VisibilityState,
 } from "@tanstack/table-core";
-import { queryJobs, getAgencies, getCategories, getCivilServiceTitles, isFtsEnabled, Job } from "../db";
+import {
+  queryJobs,
+  getAgencies,
+  getCategories,
+  getCivilServiceTitles,
+  isFtsEnabled,
+  whenReady,
+  Job,
+} from "../db";
 
 // Check if FTS feature flag is enabled via URL parameter
 const urlParams = new URLSearchParams(window.location.search);
@@ -258,13 +266,19 @@ function renderColumnDropdown(): string {
 export async function renderJobs(): Promise<void> {
   const app = getApp();
 
-  // Fetch filter options
+  // Fetch filter options (from the snapshot's facets, without waiting for
+  // the data when it has them)
   [allAgencies, allCategories, allCivilServiceTitles] = await Promise.all([
     getAgencies(),
     getCategories(),
     getCivilServiceTitles(),
   ]);
 
+  // Whether FTS is available is only known once the data has loaded
+  if (ftsFeatureEnabled) {
+    await whenReady().catch(() => {});
+  }
+
   // Build page structure
   app.innerHTML = `
     <h1>NYC Government Jobs</h1>